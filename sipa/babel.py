@@ -4,16 +4,46 @@ from babel.core import Locale, UnknownLocaleError
 from flask import request
 from flask_babel import Babel, get_locale
 
+from sipa.utils.cache import RequestCache
+
 babel = Babel()
 
+#: Holds the locale preferences of the current request
+preferences_cache = RequestCache('locale_preferences')
+
 
 def locale_preferences():
     """Return a list of locales the user accepts
 
+    The list is computed once per request.
+
     :returns: A list of locales
 
     :rtype: List of :py:obj:`Locale` s
     """
+    return preferences_cache.get_or_create('locales', _locale_preferences)
+
+
+def preferred_languages():
+    """The languages of :py:func:`locale_preferences` without
+    duplicates
+
+    The tuple is computed once per request.
+
+    :rtype: tuple of str
+    """
+    return preferences_cache.get_or_create('languages', _preferred_languages)
+
+
+def _preferred_languages():
+    languages = []
+    for locale in locale_preferences():
+        if locale.language not in languages:
+            languages.append(locale.language)
+    return tuple(languages)
+
+
+def _locale_preferences():
     main_locale = get_locale()
     locales = [main_locale]
 
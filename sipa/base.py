@@ -36,7 +36,7 @@ def load_user(username):
 
     dormitory = backends.get_dormitory(session.get('dormitory', None))
     if dormitory:
-        return dormitory.datasource.user_class.get(username)
+        return backends.user_from_uid(dormitory.datasource, username)
     else:
         return AnonymousUserMixin()
 
@@ -2,7 +2,7 @@
 import logging
 
 from flask import render_template, request, redirect, \
-    url_for, flash, session, abort, current_app, jsonify
+    url_for, flash, session, abort, current_app, jsonify, make_response
 from flask.blueprints import Blueprint
 from flask_babel import gettext, format_date
 from flask_login import current_user, login_user, logout_user, \
@@ -17,7 +17,7 @@ from sipa.model import backends
 from sipa.units import dynamic_unit, format_money
 from sipa.utils import get_user_name, redirect_url
 from sipa.utils.exceptions import UserNotFound, InvalidCredentials
-from sipa.utils.git_utils import get_repo_active_branch, get_latest_commits
+from sipa.utils.graph_utils import chart_cache_key, render_chart
 
 logger = logging.getLogger(__name__)
 
@@ -238,11 +238,57 @@ def usertraffic():
         user_id = chosen_user.id.value if chosen_user.id.supported else None
         return render_template("usertraffic.html",
                                user_id=user_id,
-                               traffic_user=chosen_user)
+                               traffic_user=chosen_user,
+                               traffic_source=('ip' if chosen_user is ip_user
+                                               else None))
 
     abort(401)
 
 
+@bp_generic.route('/usertraffic/chart/<any(traffic, credit):chart>.svg')
+def traffic_chart(chart):
+    """Render a traffic chart as a standalone SVG.
+
+    The chart shows the traffic of the ``current_user`` or, if the
+    query argument ``source=ip`` is given, of the ``ip_user``.
+
+    Like on :py:func:`usertraffic`, the chart is denied if the status
+    of the user hides the traffic data.
+
+    The ETag is the cache key of the rendered chart, so unchanged
+    charts are answered with a ``304`` before being rendered at all.
+    There is no ``Last-Modified``, as the traffic of the current day
+    keeps changing.
+    """
+    if request.args.get('source') == 'ip':
+        user = backends.user_from_ip(request.remote_addr)
+    else:
+        user = current_user
+
+    if not user.is_authenticated:
+        abort(401)
+    if not user.has_connection:
+        abort(403)
+
+    history = user.traffic.history
+    generator = current_app.extensions['chart_generators'][chart]
+    kwargs = {'max_credit': user.max_credit} if chart == 'credit' else {}
+
+    etag = chart_cache_key(generator, history, **kwargs)
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+    else:
+        svg = render_chart(generator, history,
+                           cache=current_app.extensions.get('chart_cache'),
+                           key=etag, **kwargs)
+        response = current_app.response_class(svg, mimetype='image/svg+xml')
+
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 @bp_generic.route('/usertraffic/json')
 def traffic_api():
     user = (current_user if current_user.is_authenticated
@@ -251,13 +297,14 @@ def traffic_api():
     if not user.is_authenticated:
         return jsonify(version=0)
 
+    traffic = user.traffic
     traffic_history = ({
         'in': x['input'],
         'out': x['output'],
-    } for x in reversed(user.traffic_history))
+    } for x in reversed(traffic.history))
 
     trafficdata = {
-        'quota': user.credit,
+        'quota': traffic.credit,
         # `next` gets the first entry (“today”)
         'traffic': next(traffic_history),
         'history': list(traffic_history),
@@ -325,10 +372,17 @@ def contact_official():
 
 @bp_generic.route('/version')
 def version():
-    """ Display version information from local repo """
-    sipa_dir = '/home/sipa/sipa'
-    return render_template(
+    """ Display version information from local repo
+
+    The information is collected once when initializing the app.  The
+    page is sent with an ETag, so unchanged pages are answered with a
+    ``304``.
+    """
+    version_info = current_app.extensions['version_info']
+    response = make_response(render_template(
         'version.html',
-        active_branch=get_repo_active_branch(sipa_dir),
-        commits=get_latest_commits(sipa_dir, 20),
-    )
+        active_branch=version_info.active_branch,
+        commits=version_info.commits,
+    ))
+    response.add_etag()
+    return response.make_conditional(request)
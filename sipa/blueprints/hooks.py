@@ -32,16 +32,11 @@ def content_hook():
         abort(403)
 
     logger.info("Update hook triggered. Fetching content.")
-    reload_necessary = update_repo(current_app.config['FLATPAGES_ROOT'])
-    if reload_necessary:
-        try:
-            import uwsgi
-        except ImportError:
-            logger.debug("UWSGI not present, skipping reload")
-            pass
-        else:
-            logger.debug("Reloading UWSGI...")
-            uwsgi.reload()
+    changed_paths = update_repo(current_app.config['FLATPAGES_ROOT'])
+    if changed_paths:
+        logger.debug("Reloading flatpages",
+                     extra={'data': {'changed_paths': changed_paths}})
+        current_app.extensions['content_reloader'].reload()
 
     # 204: No content
     # https://en.wikipedia.org/wiki/List_of_HTTP_status_codes#204
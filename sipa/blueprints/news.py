@@ -3,9 +3,7 @@
 """
 Blueprint providing features regarding the news entries.
 """
-from operator import attrgetter
-
-from flask import Blueprint, render_template, abort, request
+from flask import Blueprint, render_template, abort, request, current_app
 from sipa.flatpages import cf_pages
 
 
@@ -20,13 +18,9 @@ def show():
     """
     start = request.args.get('start', None, int)
     end = request.args.get('end', None, int)
-    cf_pages.reload()
-    news = sorted(
-        [article for article in cf_pages.get_articles_of_category('news')
-         if hasattr(article, 'date')],
-        key=attrgetter('date'),
-        reverse=True,
-    )
+    current_app.extensions['content_reloader'].reload_if_changed()
+    index = cf_pages.get_article_index('news')
+    news = index.dated if index else []
     if len(news) is 0:
         return render_template("index.html", articles=None,
                                previous_range=0, next_range=0)
@@ -65,10 +59,9 @@ def show():
 
 @bp_news.route("/<filename>")
 def show_news(filename):
-    news = cf_pages.get_articles_of_category('news')
-
-    for article in news:
-        if article.file_basename == filename:
-            return render_template("template.html", article=article)
+    index = cf_pages.get_article_index('news')
+    article = index.by_basename.get(filename) if index else None
+    if article is None:
+        abort(404)
 
-    abort(404)
+    return render_template("template.html", article=article)
@@ -12,9 +12,15 @@ from flask import Blueprint, render_template, current_app
 
 from sipa.flatpages import cf_pages
 from sipa.model import backends
+from sipa.utils.cache import MemoryCache
 
 logger = getLogger(__name__)
 
+#: The parsed json files keyed by ``(filename, content version)``.
+#: Missing or corrupt files are cached as ``None``.
+dynamic_json_cache = MemoryCache(max_size=256, ttl=None)
+_missing = object()
+
 bp_pages = Blueprint('pages', __name__, url_prefix='/pages')
 
 
@@ -33,7 +39,7 @@ def show(category_id, article_id):
         "{}.json".format(article.localized_page.path)
     )
 
-    dynamic_data = load_dynamic_json(box_filename)
+    dynamic_data = get_dynamic_json(box_filename)
 
     if not dynamic_data:
         return render_template('template.html', article=article,
@@ -44,6 +50,21 @@ def show(category_id, article_id):
                            dynamic=True, **dynamic_data)
 
 
+def get_dynamic_json(filename):
+    """Return the parsed dynamic json file, see
+    :py:func:`load_dynamic_json`
+
+    Every file is loaded once per content version, so a corrupt file
+    is reported only once as well.
+    """
+    key = (filename, cf_pages.content_version)
+    dynamic_data = dynamic_json_cache.get(key, default=_missing)
+    if dynamic_data is _missing:
+        dynamic_data = load_dynamic_json(filename)
+        dynamic_json_cache.set(key, dynamic_data)
+    return dynamic_data
+
+
 def load_dynamic_json(filename):
     try:
         with open(filename, encoding="utf-8") as f:
@@ -68,6 +89,7 @@ def load_dynamic_json(filename):
         logger.error("Corrupt json json_file: %s", filename, extra={
             'data': {'json_content': dynamic_data},
         }, exc_info=True)
+        return
 
     values = {
         dorm.name: values[mappings[dorm.name]]
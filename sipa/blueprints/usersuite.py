@@ -6,13 +6,15 @@
 from collections import OrderedDict
 import logging
 
-from flask import Blueprint, render_template, url_for, redirect, flash, abort
+from flask import Blueprint, render_template, url_for, redirect, flash, \
+    abort, request
 from flask_babel import gettext
 from flask_login import current_user, login_required
 
 from sipa.forms import ContactForm, ChangeMACForm, ChangeMailForm, \
     ChangePasswordForm, flash_formerrors, HostingForm, DeleteMailForm
 from sipa.mail import send_usersuite_contact_mail
+from sipa.model import backends
 from sipa.utils import password_changeable
 from sipa.utils.exceptions import DBQueryEmpty, LDAPConnectionError, \
     PasswordInvalid, UserNotFound
@@ -157,6 +159,7 @@ def change_password():
         except PasswordInvalid:
             flash(gettext("Altes Passwort war inkorrekt!"), "error")
         else:
+            backends.invalidate_user(current_user)
             flash(gettext("Passwort wurde geändert"), "success")
             return redirect(url_for('.index'))
     elif form.is_submitted():
@@ -189,6 +192,7 @@ def change_mail():
         except LDAPConnectionError:
             flash(gettext("Nicht genügend LDAP-Rechte!"), "error")
         else:
+            backends.invalidate_user(current_user)
             flash(gettext("E-Mail-Adresse wurde geändert"), "success")
             return redirect(url_for('.index'))
     elif form.is_submitted():
@@ -221,6 +225,7 @@ def delete_mail():
         except LDAPConnectionError:
             flash(gettext("Nicht genügend LDAP-Rechte!"), "error")
         else:
+            backends.invalidate_user(current_user)
             flash(gettext("E-Mail-Adresse wurde zurückgesetzt"), "success")
             return redirect(url_for('.index'))
     elif form.is_submitted():
@@ -247,6 +252,7 @@ def change_mac():
             flash(gettext("Passwort war inkorrekt!"), "error")
         else:
             current_user.mac = mac
+            backends.invalidate_user(current_user)
             logger.info('Successfully changed MAC address',
                         extra={'data': {'mac': mac},
                                'tags': {'rate_critical': True}})
@@ -272,6 +278,7 @@ def hosting(action=None):
     """
     if action == "confirm":
         current_user.userdb.drop()
+        backends.invalidate_user(current_user)
         flash(gettext("Deine Datenbank wurde gelöscht."), 'success')
         return redirect(url_for('.hosting'))
 
@@ -283,6 +290,7 @@ def hosting(action=None):
             flash(gettext("Deine Datenbank wurde erstellt."), 'success')
         else:
             current_user.userdb.change_password(form.password.data)
+        backends.invalidate_user(current_user)
     elif form.is_submitted():
         flash_formerrors(form)
 
@@ -300,7 +308,13 @@ def hosting(action=None):
 def finance_logs():
     assert hasattr(current_user, 'finance_logs')
 
+    try:
+        page = current_user.finance_log_page(before=request.args.get('before'))
+    except ValueError:
+        abort(400)
+
     return render_template('usersuite/finance_logs.html',
                            last_update=current_user.last_finance_update,
                            balance=current_user.finance_balance.raw_value,
-                           logs=current_user.finance_logs)
+                           logs=page.entries,
+                           next_key=page.next_key)
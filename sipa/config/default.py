@@ -17,11 +17,20 @@ FLATPAGES_EXTENSION = '.md'
 FLATPAGES_MARKDOWN_EXTENSIONS = [
     'sane_lists',
     'sipa.utils.bootstraped_tables',
-    'sipa.utils.link_patch',
     'meta',
     'attr_list'
 ]
 
+# The minimal seconds between two scans for pages edited in place
+CONTENT_SCAN_INTERVAL = 5
+# The file telling all processes about reloaded content.  Defaults to a
+# file in the temporary directory derived from FLATPAGES_ROOT.
+CONTENT_VERSION_FILE = None
+
+# The git checkout of sipa described on the version page
+VERSION_REPO_DIR = '/home/sipa/sipa'
+VERSION_COMMIT_COUNT = 20
+
 # Mail configuration
 MAILSERVER_HOST = ""
 MAILSERVER_PORT = 25
@@ -33,6 +42,9 @@ WU_LDAP_SEARCH_USER_BASE = None
 WU_LDAP_SEARCH_GROUP_BASE = None
 WU_LDAP_SEARCH_USER = None
 WU_LDAP_SEARCH_PASSWORD = None
+WU_LDAP_POOL_SIZE = 4
+WU_LDAP_POOL_IDLE_TIMEOUT = 300  # seconds
+WU_LDAP_POOL_CHECK_INTERVAL = 30  # seconds
 
 # Userman configuration
 # DB_USERMAN_URI: not set
@@ -48,8 +60,30 @@ DB_HELIOS_IP_MASK = None
 
 SQL_TIMEOUT = 2
 
+# Caching of user objects between requests.  Disabled if no TTL is set.
+USER_CACHE_TTL = 60  # seconds
+USER_CACHE_MAX_SIZE = 1024
+# A werkzeug.contrib.cache client to share the cache between processes
+USER_CACHE_CLIENT = None
+
+# The seconds the date of the last finance update is cached.  Disabled
+# if not set.
+FINANCE_UPDATE_TTL = 300
+
+# The number of rendered traffic charts to keep
+CHART_CACHE_SIZE = 256
+# How to render the traffic charts: 'native' or 'pygal'
+CHART_RENDERER = 'native'
+
 GEROK_ENDPOINT = ""
 GEROK_API_TOKEN = None
+# The api may take up to 3.8 seconds to answer
+GEROK_CONNECT_TIMEOUT = 2  # seconds
+GEROK_READ_TIMEOUT = 5  # seconds
+# Failed GET requests are retried after 0.1, 0.2, … seconds
+GEROK_RETRIES = 1
+GEROK_BACKOFF_FACTOR = 0.1  # seconds
+GEROK_POOL_SIZE = 4
 
 # Whether to use the timer
 UWSGI_TIMER_ENABLED = False
@@ -35,15 +35,27 @@
 # The extension the flatpages have
 # FLATPAGES_EXTENSION = '.md'
 
-# The markdown extensioins you want to use.
+# The markdown extensioins you want to use.  Don't add
+# 'sipa.utils.link_patch', it is ignored as the links are rewritten after
+# rendering.
 # FLATPAGES_MARKDOWN_EXTENSIONS = [
 #     'sane_lists',
 #     'sipa.utils.bootstraped_tables',
-#     'sipa.utils.link_patch',
 #     'meta',
 #     'attr_list'
 # ]
 
+# The minimal seconds between two scans for pages edited in place
+# CONTENT_SCAN_INTERVAL = 5
+# The file telling all processes about reloaded content.  Defaults to a
+# file in the temporary directory derived from FLATPAGES_ROOT.
+# CONTENT_VERSION_FILE = None
+
+# The git checkout of sipa and the number of its latest commits shown
+# on the version page
+# VERSION_REPO_DIR = '/home/sipa/sipa'
+# VERSION_COMMIT_COUNT = 20
+
 # Mail configuration
 # MAILSERVER_HOST = "atlantis.agdsn"
 # MAILSERVER_PORT = 25
@@ -55,6 +67,9 @@
 # WU_LDAP_SEARCH_GROUP_BASE = None
 # WU_LDAP_SEARCH_USER = None
 # WU_LDAP_SEARCH_PASSWORD = None
+# WU_LDAP_POOL_SIZE = 4
+# WU_LDAP_POOL_IDLE_TIMEOUT = 300  # seconds
+# WU_LDAP_POOL_CHECK_INTERVAL = 30  # seconds
 
 # MySQL configuration
 # DB_ATLANTIS_HOST = "atlantis.agdsn"  # Must be set
@@ -81,10 +96,33 @@
 # The SQL_TIMEOUT in seconds.
 # SQL_TIMEOUT = 2
 
+# Caching of user objects between requests.  Disabled if no TTL is set.
+# USER_CACHE_TTL = 60  # seconds
+# USER_CACHE_MAX_SIZE = 1024
+# A werkzeug.contrib.cache client to share the cache between processes,
+# e.g. werkzeug.contrib.cache.RedisCache(…)
+# USER_CACHE_CLIENT = None
+
+# The seconds the date of the last finance update is cached.  Disabled
+# if not set.
+# FINANCE_UPDATE_TTL = 300
+
+# The number of rendered traffic charts to keep
+# CHART_CACHE_SIZE = 256
+
+# How to render the traffic charts.  'pygal' uses the pygal library
+# instead of the built in renderer.
+# CHART_RENDERER = 'native'
+
 # The data for the gerok api.
 
 # GEROK_ENDPOINT = "https://gerok.agdsn:3000/api"
 # GEROK_API_TOKEN = ""
+# GEROK_CONNECT_TIMEOUT = 2
+# GEROK_READ_TIMEOUT = 5
+# GEROK_RETRIES = 1
+# GEROK_BACKOFF_FACTOR = 0.1
+# GEROK_POOL_SIZE = 4
 
 # The Token for the git update hook.
 # It is disabled if nothing provided
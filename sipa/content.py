@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+Reloading the content of every worker process
+"""
+
+import os
+from hashlib import sha1
+from logging import getLogger
+from tempfile import gettempdir
+from time import monotonic
+
+from sipa.flatpages import cf_pages
+from sipa.utils import argstr
+
+logger = getLogger(__name__)
+
+
+def default_version_file(root):
+    """Return the path of the version file shared by all processes
+    serving the content at ``root``
+
+    :param str root: The ``FLATPAGES_ROOT``
+    :rtype: str
+    """
+    digest = sha1(os.path.abspath(root).encode('utf-8')).hexdigest()
+    return os.path.join(gettempdir(),
+                        'sipa-content-{}.version'.format(digest[:12]))
+
+
+class ContentReloader:
+    """Make every worker process reload the flatpages in-process
+
+    After the content repository has been updated by one process, the
+    others have to load the new pages as well.  Instead of restarting
+    the workers (and losing their caches and connections), each one
+    swaps in a fresh category tree using
+    :py:meth:`CategorizedFlatPages.reload`.
+
+    The process updating the repository writes the new content version
+    into a :py:attr:`version_file` shared by all workers.  Before every
+    request, a worker checks whether the file has changed, which costs
+    a single ``stat``, and reloads if the version differs from its own.
+    uwsgi signals are not used for this: with ``lazy-apps``, every
+    worker registers the app on its own, so a signal handler would only
+    run in the worker that raised the signal.
+
+    Pages edited in place are picked up by :py:meth:`reload_if_changed`.
+
+    **Usage:**
+
+    >>> content_reloader.init_app(app)
+    >>> if update_repo(app.config['FLATPAGES_ROOT']):
+    ...     content_reloader.reload()
+    """
+    def __init__(self):
+        self.app = None
+        #: The file holding the latest content version, shared by all
+        #: processes
+        self.version_file = None
+        #: The minimal seconds between two scans of the content
+        self.scan_interval = 5
+        self._last_scan = None
+        #: The stat of :py:attr:`version_file` as seen the last time
+        self._version_file_stat = None
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            version_file=self.version_file,
+            scan_interval=self.scan_interval,
+        ))
+
+    def init_app(self, app):
+        app.extensions['content_reloader'] = self
+        self.app = app
+        self.version_file = (
+            app.config.get('CONTENT_VERSION_FILE')
+            or default_version_file(app.config['FLATPAGES_ROOT'])
+        )
+        self.scan_interval = app.config.get('CONTENT_SCAN_INTERVAL', 5)
+        self._last_scan = None
+        self._version_file_stat = None
+        app.before_request(self._before_request)
+
+    def reload(self):
+        """Reload the content of every worker
+
+        The current process is reloaded right away, the others before
+        their next request.
+        """
+        self.reload_local()
+        self._write_version(cf_pages.content_version)
+
+    def reload_if_outdated(self):
+        """Reload the current process if another one has published a
+        different content version
+
+        :return: Whether the pages have been reloaded
+        :rtype: bool
+        """
+        try:
+            stat = os.stat(self.version_file)
+        except FileNotFoundError:
+            return False
+
+        stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stat_key == self._version_file_stat:
+            return False
+        self._version_file_stat = stat_key
+
+        try:
+            with open(self.version_file) as f:
+                version = f.read().strip()
+        except OSError:
+            logger.warning("Could not read the content version file %s",
+                           self.version_file, exc_info=True)
+            return False
+
+        if version == cf_pages.content_version:
+            return False
+
+        try:
+            self.reload_local()
+        except Exception:
+            logger.exception("Could not reload the content")
+            return False
+        return True
+
+    def reload_if_changed(self):
+        """Reload the current process if the content directory changed
+
+        Scanning the directory stats every page, so it is done at most
+        once per :py:attr:`scan_interval`.
+
+        :return: Whether the pages have been reloaded
+        :rtype: bool
+        """
+        now = monotonic()
+        if (self._last_scan is not None
+                and now - self._last_scan < self.scan_interval):
+            return False
+        self._last_scan = now
+
+        return cf_pages.reload_if_changed()
+
+    def reload_local(self):
+        """Reload the content of the current process"""
+        with self.app.app_context():
+            cf_pages.reload()
+        logger.info("Reloaded content", extra={'data': {
+            'content_version': cf_pages.content_version,
+        }})
+
+    def _before_request(self):
+        # a value returned by a `before_request` handler would be taken
+        # as the response
+        self.reload_if_outdated()
+
+    def _write_version(self, version):
+        """Atomically replace the :py:attr:`version_file`"""
+        temp_file = "{}.{}.tmp".format(self.version_file, os.getpid())
+        with open(temp_file, 'w') as f:
+            f.write(version)
+        os.replace(temp_file, self.version_file)
+
+
+content_reloader = ContentReloader()
@@ -1,14 +1,57 @@
 # -*- coding: utf-8 -*-
-from operator import attrgetter
+import logging
+import os
+from collections import namedtuple
+from hashlib import sha1
+from operator import attrgetter, itemgetter
 from os.path import basename, dirname, splitext
+from threading import Lock
 
 from babel.core import Locale, UnknownLocaleError
 from yaml.scanner import ScannerError
 
-from flask import abort, request
+from flask import abort, has_request_context, render_template, request
 from flask_flatpages import FlatPages
+from markupsafe import Markup
 
-from .babel import babel, locale_preferences
+from .babel import babel, preferred_languages
+from .utils import argstr
+from .utils.cache import MemoryCache
+from .utils.link_patch import rewrite_links
+
+logger = logging.getLogger(__name__)
+
+#: The number of language preferences an article memoizes its page for
+MAX_PAGE_MEMO_SIZE = 32
+
+#: The html of the pages with the links rewritten, keyed by
+#: ``(page path, content version, script root)``
+html_cache = MemoryCache(max_size=1024, ttl=None)
+
+
+def page_basename(page):
+    """The basename of a page without extension.
+
+    Example: `categ/article.en.md` → `article.en`
+    """
+    return splitext(basename(page.path))[0]
+
+
+#: A category as shown in the navigation bar
+NavigationCategory = namedtuple('NavigationCategory',
+                                ['id', 'name', 'articles'])
+
+#: An article as shown in the navigation bar.  ``link`` is the
+#: absolute path given in the page's ``link`` meta attribute, if any.
+NavigationArticle = namedtuple('NavigationArticle',
+                               ['id', 'title', 'glyphicon', 'link'])
+
+#: The navigation models keyed by ``(content version, languages)``
+navigation_cache = MemoryCache(max_size=64, ttl=None)
+
+#: The rendered navigation bars keyed by ``(content version, languages,
+#: url root)``
+navigation_html_cache = MemoryCache(max_size=256, ttl=None)
 
 
 class Node:
@@ -20,6 +63,14 @@ class Node:
         #: This object's id
         self.id = node_id
 
+    @property
+    def root(self):
+        """The root category of the tree this node belongs to"""
+        node = self
+        while node.parent is not None:
+            node = node.parent
+        return node
+
 
 class Article(Node):
     """The Article class
@@ -42,6 +93,9 @@ class Article(Node):
         self.localized_pages = {}
         #: The default page
         self.default_page = None
+        #: The resolved page per language preference, see
+        #: :py:attr:`localized_page`
+        self._page_memo = {}
 
     def add_page(self, page, locale):
         """Add a page to the pages list.
@@ -65,6 +119,7 @@ class Article(Node):
         self.localized_pages[str(locale)] = page
         if self.default_page is None or locale == babel.default_locale:
             self.default_page = page
+        self._page_memo.clear()
 
     @staticmethod
     def validate_page_meta(page):
@@ -105,10 +160,22 @@ class Article(Node):
     def html(self):
         """The :py:attr:`localized_page` as html
 
+        The markdown is rendered once per page and content version.
+        Only the links are rewritten for the script root of the
+        request, see :py:func:`~sipa.utils.link_patch.rewrite_links`.
+
         :returns: The :py:attr:`localized_page` converted to html
         :rtype: str
         """
-        return self.localized_page.html
+        page = self.localized_page
+        script_root = request.script_root if has_request_context() else ""
+        key = (page.path, self.root.content_version, script_root)
+
+        html = html_cache.get(key)
+        if html is None:
+            html = rewrite_links(page.html, script_root)
+            html_cache.set(key, html)
+        return html
 
     @property
     def link(self):
@@ -156,17 +223,34 @@ class Article(Node):
         :py:func:`~sipa.babel.locale_preferences`, or
         :py:attr:`default_page`.
 
+        The result is memoized per language preference.
+
         :returns: The localized page
         :rtype: Whatever has been added, hopefully :py:class:`Page`
         """
-        available_locales = list(self.localized_pages.keys())
-        for locale in locale_preferences():
-            # Locale is unfortunately not hashable
-            # so locale in self.localized_pages does not work
-            for available_locale in available_locales:
-                if available_locale == locale.language:
-                    localized_page = self.localized_pages.get(available_locale)
-                    return localized_page
+        languages = preferred_languages()
+        try:
+            return self._page_memo[languages]
+        except KeyError:
+            pass
+
+        if len(self._page_memo) >= MAX_PAGE_MEMO_SIZE:
+            # arbitrary `Accept-Language` headers must not let it grow
+            self._page_memo.clear()
+        page = self._page_memo[languages] = self.page_for(languages)
+        return page
+
+    def page_for(self, languages):
+        """The page of the first available language of ``languages``
+
+        :param languages: The languages in order of preference
+        :returns: The page or :py:attr:`default_page` if none of the
+            languages is available
+        """
+        for language in languages:
+            page = self.localized_pages.get(language)
+            if page is not None:
+                return page
         return self.default_page
 
     @property
@@ -179,7 +263,41 @@ class Article(Node):
 
         :rtype: str
         """
-        return splitext(basename(self.localized_page.path))[0]
+        return page_basename(self.localized_page)
+
+
+class ArticleIndex:
+    """The articles of a category resolved for one language preference
+
+    :py:attr:`dated` holds the articles having a ``date`` sorted by
+    it, newest first, so paginating is just slicing.
+    :py:attr:`by_basename` maps the basename of the localized page
+    (see :py:attr:`Article.file_basename`) to its article.
+
+    The ``index`` article is not part of the index.
+
+    :param articles: The articles to index
+    :param tuple languages: The languages in order of preference
+    """
+    def __init__(self, articles, languages):
+        dated = []
+        self.by_basename = {}
+        for article in articles:
+            if article.id == 'index':
+                continue
+            page = article.page_for(languages)
+            self.by_basename[page_basename(page)] = article
+            if 'date' in page.meta:
+                dated.append((page.meta['date'], article))
+
+        dated.sort(key=itemgetter(0), reverse=True)
+        self.dated = [article for _, article in dated]
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            articles=len(self.by_basename),
+            dated=len(self.dated),
+        ))
 
 
 class Category(Node):
@@ -191,8 +309,15 @@ class Category(Node):
     """
     def __init__(self, parent, category_id):
         super().__init__(parent, category_id)
+        #: The content version the tree has been built from.  Only
+        #: set on the root category.
+        self.content_version = None
         self.categories = {}
         self._articles = {}
+        #: The languages of the pages of this category
+        self._languages = set()
+        #: The :py:class:`ArticleIndex` per language preference
+        self._indexes = {}
 
     @property
     def articles(self):
@@ -267,6 +392,55 @@ class Category(Node):
             self._articles[article_id] = article
 
         article.add_page(page, locale)
+        self._languages.add(str(locale))
+
+    def get_index(self, languages):
+        """Return the :py:class:`ArticleIndex` for ``languages``
+
+        The index is built on first use.  Languages no page is
+        available in are ignored, which keeps the number of indexes
+        bounded.
+
+        :param tuple languages: The languages in order of preference
+        :rtype: ArticleIndex
+        """
+        languages = tuple(language for language in languages
+                          if language in self._languages)
+        index = self._indexes.get(languages)
+        if index is None:
+            index = ArticleIndex(self._articles.values(), languages)
+            self._indexes[languages] = index
+        return index
+
+
+def scan_content_version(root, extensions):
+    """Compute a version of the pages below ``root``.
+
+    The version covers the path, modification time and size of every
+    page, so it changes whenever a page is added, removed or edited.
+    Hidden directories like ``.git`` are skipped.
+
+    :param str root: The directory to scan
+    :param tuple extensions: The file extensions of pages
+    :return: A hex digest
+    :rtype: str
+    """
+    entries = []
+    for path, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not name.startswith('.')]
+        for name in filenames:
+            if not name.endswith(extensions):
+                continue
+            filename = os.path.join(path, name)
+            try:
+                stat = os.stat(filename)
+            except FileNotFoundError:
+                # removed while scanning
+                continue
+            entries.append("{}:{}:{}".format(filename, stat.st_mtime_ns,
+                                             stat.st_size))
+
+    return sha1("\n".join(sorted(entries)).encode('utf-8')).hexdigest()
 
 
 class CategorizedFlatPages:
@@ -281,10 +455,11 @@ class CategorizedFlatPages:
     def __init__(self):
         self.flat_pages = FlatPages()
         self.root_category = Category(None, '<root>')
+        self._reload_lock = Lock()
 
     def init_app(self, app):
         self.flat_pages.init_app(app)
-        self._init_categories()
+        self.reload()
 
     @property
     def categories(self):
@@ -293,6 +468,66 @@ class CategorizedFlatPages:
         return sorted(self.root_category.categories.values(),
                       key=attrgetter('rank'))
 
+    def get_navigation(self):
+        """Return the navigation model for the current language
+        preference
+
+        The categories with an ``index`` are sorted by rank and hold
+        their articles with a title, sorted by rank as well.  The
+        model is built once per content version and language
+        preference.
+
+        :rtype: tuple of :py:obj:`NavigationCategory`
+        """
+        key = (self.content_version, preferred_languages())
+        navigation = navigation_cache.get(key)
+        if navigation is None:
+            # categories without an index article are not shown
+            categories = [category for category
+                          in self.root_category.categories.values()
+                          if getattr(category, 'index', False)]
+            navigation = tuple(
+                NavigationCategory(
+                    id=category.id,
+                    name=category.name,
+                    articles=tuple(self._navigation_articles(category)),
+                )
+                for category in sorted(categories, key=attrgetter('rank'))
+            )
+            navigation_cache.set(key, navigation)
+        return navigation
+
+    @staticmethod
+    def _navigation_articles(category):
+        for article in category.articles:
+            if article.id == 'index' or not getattr(article, 'title', None):
+                continue
+
+            link = article.localized_page.meta.get('link')
+            yield NavigationArticle(
+                id=article.id,
+                title=article.title,
+                glyphicon=getattr(article, 'glyphicon', ""),
+                link=link if link and link[0] == "/" else None,
+            )
+
+    def render_navigation(self):
+        """Render the categories of the navigation bar
+
+        The html is cached per content version, language preference
+        and url root.
+
+        :rtype: :py:class:`~markupsafe.Markup`
+        """
+        key = (self.content_version, preferred_languages(), request.url_root)
+        html = navigation_html_cache.get(key)
+        if html is None:
+            html = render_template('drafts/_navigation.html',
+                                   categories=self.get_navigation(),
+                                   link_base=dirname(request.url_root))
+            navigation_html_cache.set(key, html)
+        return Markup(html)
+
     def get(self, category_id, article_id):
         category = self.root_category.categories.get(category_id)
         if category is None:
@@ -317,6 +552,17 @@ class CategorizedFlatPages:
                     articles.append(a)
         return articles
 
+    def get_article_index(self, category_id):
+        """Return the :py:class:`ArticleIndex` of a category for the
+        language preference of the current request
+
+        :returns: The index or ``None`` if the category doesn't exist
+        """
+        category = self.get_category(category_id)
+        if category is None:
+            return None
+        return category.get_index(preferred_languages())
+
     def get_or_404(self, category_id, article_id):
         """Fetch a static page"""
         page = self.get(category_id, article_id)
@@ -324,21 +570,103 @@ class CategorizedFlatPages:
             abort(404)
         return page
 
-    def _init_categories(self):
+    @property
+    def content_version(self):
+        """The version of the content the categories have been built
+        from, see :py:func:`scan_content_version`"""
+        return self.root_category.content_version
+
+    def _build_categories(self, version=None):
+        """Build a new category tree from the flatpages
+
+        :param str version: The content version of the flatpages
+        :return: The new root category
+        :rtype: Category
+        """
+        root_category = Category(None, '<root>')
+        root_category.content_version = version
         # TODO: Store categories, not articles
         for page in self.flat_pages:
             # get category + page name
             # plus, assert that there is nothing more to that.
             components = page.path.split('/')
-            parent = self.root_category
+            parent = root_category
             for category_id in components[:-1]:
                 parent = parent.add_child_category(category_id)
             basename = components[-1]
             parent.add_article(basename, page)
+        return root_category
+
+    def scan_content_version(self):
+        """Scan the content directory for its current version
+
+        Besides the pages, the version covers the ``.json`` files
+        holding the dynamic content of a page.
+
+        :rtype: str
+        """
+        extensions = self.flat_pages.config('extension')
+        if isinstance(extensions, str):
+            extensions = extensions.split(',')
+        return scan_content_version(self.flat_pages.root,
+                                    tuple(extensions) + ('.json',))
 
     def reload(self):
+        """Reload the pages and rebuild the categories.
+
+        The new category tree replaces the old one in a single
+        assignment, so readers either see the old or the new tree,
+        never a partially built one.
+        """
+        with self._reload_lock:
+            self._load(self.scan_content_version())
+
+    def reload_if_changed(self):
+        """Reload if the content directory has changed since the last
+        load.
+
+        If another thread is already reloading, the current tree is
+        kept instead of waiting for it.
+
+        :return: Whether the pages have been reloaded
+        :rtype: bool
+        """
+        if self.scan_content_version() == self.content_version:
+            return False
+
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            version = self.scan_content_version()
+            if version == self.content_version:
+                return False
+            self._load(version)
+        finally:
+            self._reload_lock.release()
+
+        return True
+
+    def _load(self, version):
+        """Load the pages and swap in a new category tree
+
+        ``version`` has to be scanned *before*, so changes made while
+        loading trigger another reload instead of going unnoticed.
+        """
         self.flat_pages.reload()
-        self._init_categories()
+        root_category = self._build_categories(version)
+        self._render_pages()
+        self.root_category = root_category
+
+    def _render_pages(self):
+        """Render the markdown of all pages
+
+        This way, the first request after a reload doesn't have to.
+        """
+        for page in self.flat_pages:
+            try:
+                page.html
+            except Exception:
+                logger.exception("Could not render page %s", page.path)
 
 
 cf_pages = CategorizedFlatPages()
@@ -8,18 +8,19 @@ from flask_babel import get_locale
 from raven import setup_logging
 from raven.contrib.flask import Sentry
 from raven.handlers.logging import SentryHandler
-from sipa.babel import babel, possible_locales
+from sipa.babel import babel, possible_locales, preferences_cache
 from sipa.base import IntegerConverter, babel_selector, login_manager
 from sipa.blueprints.usersuite import get_attribute_endpoint
+from sipa.content import content_reloader
 from sipa.defaults import DEFAULT_CONFIG
 from sipa.flatpages import cf_pages
 from sipa.model import Backends
 from sipa.utils import replace_empty_handler_callables
 from sipa.utils.babel_utils import get_weekday
-from sipa.utils.git_utils import init_repo, update_repo
-from sipa.utils.graph_utils import (generate_credit_chart,
-                                    generate_traffic_chart,
-                                    provide_render_function)
+from sipa.utils.cache import MemoryCache
+from sipa.utils.git_utils import get_version_info, init_repo, update_repo
+from sipa.utils.exceptions import InvalidConfiguration
+from sipa.utils.graph_utils import CHART_GENERATORS, provide_render_function
 
 logger = logging.getLogger(__name__)
 
@@ -40,7 +41,9 @@ def init_app(app, **kwargs):
     login_manager.init_app(app)
     babel.init_app(app)
     babel.localeselector(babel_selector)
+    preferences_cache.init_app(app)
     cf_pages.init_app(app)
+    content_reloader.init_app(app)
     backends = Backends()
     backends.init_app(app)
 
@@ -58,6 +61,23 @@ def init_app(app, **kwargs):
     app.register_blueprint(bp_news)
     app.register_blueprint(bp_hooks)
 
+    # Traffic data changes once a day, so there is no need for a TTL
+    chart_cache = MemoryCache(max_size=app.config['CHART_CACHE_SIZE'],
+                              ttl=None)
+    app.extensions['chart_cache'] = chart_cache
+    try:
+        chart_generators = CHART_GENERATORS[app.config['CHART_RENDERER']]
+    except KeyError:
+        raise InvalidConfiguration("Unknown chart renderer {!r}"
+                                   .format(app.config['CHART_RENDERER']))
+    app.extensions['chart_generators'] = chart_generators
+
+    # The code only changes on a restart, so the commits are read once
+    app.extensions['version_info'] = get_version_info(
+        app.config['VERSION_REPO_DIR'],
+        app.config['VERSION_COMMIT_COUNT'],
+    )
+
     from sipa.model import query_gauge_data
     logger.debug('Registering Jinja globals')
     form_label_width = 3
@@ -69,8 +89,10 @@ def init_app(app, **kwargs):
         get_weekday=get_weekday,
         possible_locales=possible_locales,
         get_attribute_endpoint=get_attribute_endpoint,
-        traffic_chart=provide_render_function(generate_traffic_chart),
-        credit_chart=provide_render_function(generate_credit_chart),
+        traffic_chart=provide_render_function(chart_generators['traffic'],
+                                              cache=chart_cache),
+        credit_chart=provide_render_function(chart_generators['credit'],
+                                             cache=chart_cache),
         current_datasource=backends.current_datasource,
         form_label_width_class="col-sm-{}".format(form_label_width),
         form_input_width_class="col-sm-{}".format(form_input_width),
@@ -125,9 +147,13 @@ def init_env_and_config(app):
 
 
 def try_register_uwsgi_timer(app):
-    """Register the uwsgi timer if uwsgi isavailable"""
+    """Register the uwsgi timer if uwsgi isavailable
+
+    The timer updates the content repository in one process and makes
+    every worker reload its pages using the
+    :py:class:`~sipa.content.ContentReloader` of the app.
+    """
     try:
-        import uwsgi
         from uwsgidecorators import timer
     except ImportError:
         logger.info("uwsgi package not found, uwsgi_timer hasn't been set")
@@ -136,14 +162,11 @@ def try_register_uwsgi_timer(app):
         def update_uwsgi(signum):
             flatpages_root = app.config["FLATPAGES_ROOT"]
             logger.debug("Udpating git repository at %s", flatpages_root)
-            hasToReload = update_repo(flatpages_root)
-            if hasToReload:
-                logger.debug("Reloading flatpages and uwsgi", extra={'data': {
-                    'uwsgi.numproc': uwsgi.numproc,
-                    'uwsgi.opt': uwsgi.opt,
-                    'uwsgi.applications': uwsgi.applications,
-                }})
-                uwsgi.reload()
+            changed_paths = update_repo(flatpages_root)
+            if changed_paths:
+                logger.debug("Reloading flatpages",
+                             extra={'data': {'changed_paths': changed_paths}})
+                app.extensions['content_reloader'].reload()
 
         logger.debug("Registered repo update to uwsgi signal")
 
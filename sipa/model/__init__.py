@@ -10,7 +10,11 @@ from sqlalchemy.exc import OperationalError
 from werkzeug.local import LocalProxy
 
 from . import sample, wu, gerok, hss
+from .datasource import SubnetIndex
 from .sqlalchemy import db
+from .user import traffic_cache
+from .user_cache import UserSnapshotCache
+from sipa.utils.cache import MemoryCache, RequestCache
 from sipa.utils.exceptions import InvalidConfiguration
 
 
@@ -111,6 +115,12 @@ class Backends:
         self._dormitories = {}
         #: The premature_dormitories dict
         self._premature_dormitories = {}
+        #: The index mapping ips to the registered dormitories
+        self._subnet_index = SubnetIndex()
+        #: The per-request cache of the users looked up by ip or uid
+        self.user_cache = RequestCache('backends_user_cache')
+        #: The cache of user snapshots shared between requests
+        self.user_snapshots = UserSnapshotCache()
 
     def init_app(self, app):
         """Register self to app and initialize datasources
@@ -122,6 +132,17 @@ class Backends:
         """
         app.extensions['backends'] = self
         self.app = app
+        self.user_cache.init_app(app)
+        self.user_snapshots.init_app(app)
+        traffic_cache.init_app(app)
+
+        # The date of the last finance update is the same for every
+        # user of a datasource, so it is cached per datasource
+        finance_update_ttl = app.config.get('FINANCE_UPDATE_TTL')
+        app.extensions['finance_update_cache'] = (
+            MemoryCache(max_size=16, ttl=finance_update_ttl)
+            if finance_update_ttl else None
+        )
 
         backends = app.config.get('BACKENDS')
         if not backends:
@@ -172,14 +193,20 @@ class Backends:
     def _register_dormitory(self, dormitory):
         """Register a dormitory by putting it to the dict
 
+        The dormitory's subnets are added to the ip index used by
+        :py:meth:`dormitory_from_ip`.
+
         :param dormitory: The dormitory to register
         :raises: `ValueError` if a dormitory with this name is already
-            registered.
+            registered or one of its subnets overlaps with the subnet
+            of an already registered dormitory.  In that case, none of
+            its subnets are added to the index.
         """
         name = dormitory.name
         if name in self._dormitories:
             raise ValueError("Dormitory with name {} already exists"
                              .format(name))
+        self._subnet_index.add_all(dormitory.subnets.subnets, dormitory)
         self._dormitories[name] = dormitory
 
     @staticmethod
@@ -284,19 +311,21 @@ class Backends:
     def dormitory_from_ip(self, ip):
         """Return the dormitory whose subnets contain ``ip``
 
+        The lookup is done using the precomputed
+        :py:class:`~sipa.model.datasource.SubnetIndex`, which is filled
+        when registering the dormitories.
+
         :param str ip: The ip
 
         :return: The dormitory containing ``ip``
         :rtype: :py:class:`~sipa.model.datasource.Dormitory`
         """
         try:
-            address = IPv4Address(str(ip))
+            address = int(IPv4Address(str(ip)))
         except AddressValueError:
-            pass
-        else:
-            for dormitory in self.dormitories:
-                if address in dormitory.subnets:
-                    return dormitory
+            return None
+
+        return self._subnet_index.get(address)
 
     def preferred_dormitory_name(self):
         """Return the name of the preferred dormitory based on the
@@ -313,6 +342,9 @@ class Backends:
         """Return the User that corresponds to ``ip`` according to the
         datasource.
 
+        The result is cached for the rest of the request, keyed by
+        the datasource and ``ip``.
+
         :param str ip: The ip
 
         :return: The corresponding User in the sense of the
@@ -327,7 +359,41 @@ class Backends:
         if datasource is None:
             return AnonymousUserMixin()
 
-        return datasource.user_class.from_ip(ip)
+        return self.user_cache.get_or_create(
+            ('ip', datasource.name, ip),
+            lambda: datasource.user_class.from_ip(ip),
+        )
+
+    def user_from_uid(self, datasource, uid):
+        """Return the User of ``datasource`` with the id ``uid``.
+
+        The result is cached for the rest of the request, keyed by
+        the datasource and ``uid``.  Across requests, the user is
+        restored from :py:attr:`user_snapshots` if possible.
+
+        :param datasource: The datasource to ask
+        :param str uid: The user id (login)
+
+        :return: The User or an anonymous user if there is none
+        :rtype: The corresponding datasources ``user_class``.
+        """
+        return self.user_cache.get_or_create(
+            ('uid', datasource.name, uid),
+            lambda: self.user_snapshots.get_or_create(
+                datasource, uid,
+                lambda: datasource.user_class.get(uid),
+            ),
+        )
+
+    def invalidate_user(self, user):
+        """Drop the cached snapshot of ``user``
+
+        This has to be called after every change to a user, so
+        the next request sees the current state.
+
+        :param user: The changed user
+        """
+        self.user_snapshots.invalidate(user.datasource, user.uid)
 
     # PROXIES
 
@@ -362,7 +428,7 @@ def query_gauge_data():
             user = current_user
         else:
             user = backends.user_from_ip(request.remote_addr)
-        credit['data'] = user.credit
+        credit['data'] = user.traffic.credit
     except OperationalError:
         credit['error'] = True
     except AttributeError:
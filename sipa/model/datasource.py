@@ -1,4 +1,5 @@
 import logging
+from bisect import bisect_right
 from ipaddress import IPv4Network
 
 from sipa.utils import argstr
@@ -133,6 +134,96 @@ class SubnetCollection:
         return xor_hashes(*self.subnets)
 
 
+class SubnetIndex:
+    """A lookup table mapping IPv4 addresses to the owner of the
+    subnet containing them.
+
+    The subnets are stored as a sorted list of disjoint integer
+    ranges, so a lookup is a binary search over the range starts
+    instead of a membership test against every single subnet.
+
+    **Usage:**
+
+    >>> from ipaddress import IPv4Address, IPv4Network
+    >>> index = SubnetIndex()
+    >>> index.add(IPv4Network('10.0.0.0/24'), 'foo')
+    >>> index.get(int(IPv4Address('10.0.0.42')))
+    'foo'
+    """
+
+    def __init__(self):
+        #: The first address of each range (sorted)
+        self._starts = []
+        #: The last address of each range
+        self._ends = []
+        #: The owner of each range
+        self._values = []
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            ranges=len(self._starts),
+        ))
+
+    def __len__(self):
+        return len(self._starts)
+
+    def add(self, subnet, value):
+        """Register ``subnet`` as being owned by ``value``.
+
+        :param IPv4Network subnet: The subnet to add
+        :param value: The object to return for addresses in ``subnet``
+        :raises: `ValueError` if ``subnet`` overlaps with a subnet
+            already registered
+        """
+        start = int(subnet.network_address)
+        end = int(subnet.broadcast_address)
+        position = bisect_right(self._starts, start)
+
+        overlaps_previous = position > 0 and self._ends[position - 1] >= start
+        overlaps_next = (position < len(self._starts)
+                         and self._starts[position] <= end)
+        if overlaps_previous or overlaps_next:
+            other = position - 1 if overlaps_previous else position
+            raise ValueError("Subnet {} of {!r} overlaps with a subnet of {!r}"
+                             .format(subnet, value, self._values[other]))
+
+        self._starts.insert(position, start)
+        self._ends.insert(position, end)
+        self._values.insert(position, value)
+
+    def add_all(self, subnets, value):
+        """Register all ``subnets`` as being owned by ``value``.
+
+        Either all of the subnets are added or, if one of them
+        overlaps, none of them.
+
+        :param subnets: The subnets to add
+        :type subnets: iterable of IPv4Network
+        :param value: The object to return for addresses in ``subnets``
+        :raises: `ValueError` if one of ``subnets`` overlaps with a
+            subnet already registered or another one of ``subnets``
+        """
+        saved = list(self._starts), list(self._ends), list(self._values)
+        try:
+            for subnet in subnets:
+                self.add(subnet, value)
+        except ValueError:
+            self._starts, self._ends, self._values = saved
+            raise
+
+    def get(self, address):
+        """Return the owner of the subnet containing ``address``.
+
+        :param int address: The address as an integer,
+            e.g. ``int(IPv4Address(ip))``
+        :return: The owner or ``None`` if no subnet contains it
+        """
+        position = bisect_right(self._starts, address) - 1
+        if position >= 0 and address <= self._ends[position]:
+            return self._values[position]
+        return None
+
+
 class Dormitory:
     """A dormitory as selectable on the login page."""
 
@@ -7,15 +7,30 @@ from . import user
 from sipa.utils.exceptions import InvalidConfiguration
 
 
+#: The optional config keys passed on to the :py:class:`user.ApiClient`
+CLIENT_OPTIONS = {
+    'GEROK_CONNECT_TIMEOUT': 'connect_timeout',
+    'GEROK_READ_TIMEOUT': 'read_timeout',
+    'GEROK_RETRIES': 'retries',
+    'GEROK_BACKOFF_FACTOR': 'backoff_factor',
+    'GEROK_POOL_SIZE': 'pool_size',
+}
+
+
 def init_context(app):
     try:
         app.extensions['gerok_api'] = {
             'endpoint': app.config['GEROK_ENDPOINT'],
-            'token': app.config['GEROK_API_TOKEN']
+            'token': app.config['GEROK_API_TOKEN'],
         }
     except KeyError as exception:
         raise InvalidConfiguration(*exception.args)
 
+    app.extensions['gerok_api']['client'] = user.ApiClient(**{
+        option: app.config[key] for key, option in CLIENT_OPTIONS.items()
+        if key in app.config
+    })
+
 
 datasource = DataSource(
     name='gerok',
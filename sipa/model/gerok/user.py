@@ -1,9 +1,12 @@
 # -*- coding: utf-8 -*-
 import logging
+from collections import Counter
 from datetime import date, timedelta
 from functools import partial
+from time import sleep
 
 import requests
+from requests.adapters import HTTPAdapter
 from flask_login import AnonymousUserMixin
 from flask.globals import current_app
 from werkzeug.local import LocalProxy
@@ -13,12 +16,117 @@ from sipa.model.fancy_property import active_prop, connection_dependent, \
     unsupported_prop
 from sipa.utils import argstr
 from sipa.utils.exceptions import PasswordInvalid, UserNotFound
+from sipa.utils.metrics import LatencyHistogram
 
 logger = logging.getLogger(__name__)
 
 
 endpoint = LocalProxy(lambda: current_app.extensions['gerok_api']['endpoint'])
 token = LocalProxy(lambda: current_app.extensions['gerok_api']['token'])
+client = LocalProxy(lambda: current_app.extensions['gerok_api']['client'])
+
+
+class ApiClient:
+    """A keep-alive HTTP client for the NVTool api
+
+    The connections are kept in a pool of up to ``pool_size``
+    connections, so consecutive calls don't have to establish a new
+    TCP and TLS connection.  Since the pool must not be shared between
+    processes, the client has to be created in every worker (which is
+    the case with uwsgi's ``lazy-apps``).
+
+    ``GET`` requests are idempotent and therefore retried up to
+    ``retries`` times with an exponential backoff if the connection
+    failed or the server answered with one of
+    :py:obj:`RETRY_STATUS_CODES`.  Read timeouts are not retried,
+    because the api already took ``read_timeout`` seconds to not
+    answer.
+
+    The durations of the requests are collected in one
+    :py:class:`LatencyHistogram` per method.
+
+    :param float connect_timeout: The connect timeout in seconds
+    :param float read_timeout: The read timeout in seconds
+    :param int retries: How often to retry a ``GET`` request
+    :param float backoff_factor: The seconds to wait before the first
+        retry, doubled for every further one
+    :param int pool_size: The number of connections to keep alive
+    """
+    RETRY_STATUS_CODES = frozenset({502, 503, 504})
+
+    def __init__(self, connect_timeout=2, read_timeout=5, retries=1,
+                 backoff_factor=0.1, pool_size=4):
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self.latencies = {method: LatencyHistogram()
+                          for method in ('get', 'post')}
+        #: Counts of ``retries`` and ``errors``
+        self.stats = Counter()
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            timeout=self.timeout,
+            retries=self.retries,
+            backoff_factor=self.backoff_factor,
+            pool_size=self.pool_size,
+        ))
+
+    @property
+    def metrics(self):
+        """The latency histograms and the counters of :py:attr:`stats`
+        as a dict"""
+        metrics = {key: self.stats[key] for key in ('retries', 'errors')}
+        metrics['latency'] = {method: histogram.metrics for method, histogram
+                              in self.latencies.items()}
+        return metrics
+
+    def request(self, url, method='get', data=None, headers=None):
+        """Send a request, retrying failed ``GET`` requests
+
+        :raises requests.RequestException: if the last attempt failed
+        :rtype: requests.Response
+        """
+        if method == 'get':
+            send = self.session.get
+            attempts = self.retries + 1
+        elif method == 'post':
+            send = partial(self.session.post, data=data)
+            attempts = 1
+        else:
+            raise ValueError("`method` must be one of ['get', 'post']!")
+
+        for attempt in range(attempts):
+            if attempt:
+                self.stats['retries'] += 1
+                sleep(self.backoff_factor * 2 ** (attempt - 1))
+            last_attempt = attempt == attempts - 1
+
+            try:
+                with self.latencies[method].time():
+                    response = send(url, verify=False, headers=headers,
+                                    timeout=self.timeout)
+            except requests.exceptions.ReadTimeout:
+                self.stats['errors'] += 1
+                raise
+            except requests.RequestException:
+                self.stats['errors'] += 1
+                if last_attempt:
+                    raise
+                continue
+
+            if (response.status_code in self.RETRY_STATUS_CODES
+                    and not last_attempt):
+                continue
+
+            return response
 
 
 # noinspection PyMethodMayBeStatic
@@ -223,20 +331,14 @@ def do_api_call(request, method='get', postdata=None):
     """Request the NVTool-Api for informations
     """
 
-    if method == 'get':
-        request_function = requests.get
-    elif method == 'post':
-        request_function = partial(requests.post, data=postdata)
-    else:
-        raise ValueError("`method` must be one of ['get', 'post']!")
-
     try:
-        response = request_function(
+        response = client.request(
             endpoint + request,
-            verify=False,
+            method=method,
+            data=postdata,
             headers={'Authorization': 'Token token={}'.format(token)},
         )
-    except ConnectionError as e:
+    except requests.RequestException as e:
         logger.error("Caught a ConnectionError when accessing Gerok API",
                      extra={'data': {'endpoint': endpoint + request}})
         raise ConnectionError("Gerok API unreachable") from e
@@ -1,10 +1,10 @@
 from datetime import datetime
-from operator import attrgetter
 
-from sqlalchemy import Column, ForeignKey
+from sqlalchemy import Column, ForeignKey, Index, literal_column, select, \
+    union_all
 from sqlalchemy.types import String, Integer, BigInteger, Date, Boolean, Numeric, \
     TIMESTAMP
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import object_session, relationship
 from sqlalchemy.dialects.postgresql import INET, MACADDR
 from sqlalchemy.ext.hybrid import hybrid_property
 
@@ -37,12 +37,16 @@ class Account(db.Model):
 
     @property
     def combined_transactions(self):
-        return sorted([
-            *(TransactionTuple(value=-f.fee_object.amount, datum=f.fee_object.timestamp)
-              for f in self.fees),
-            *(TransactionTuple(value=t.amount, datum=t.timestamp)
-              for t in self.transactions),
-        ], key=attrgetter('datum'))
+        """The fees and statements of the account in chronological order
+
+        :rtype: list of :py:class:`~sipa.model.misc.TransactionTuple`
+        """
+        log = transaction_log(self.account)
+        return [
+            TransactionTuple(datum=row.timestamp, value=row.value)
+            for row in object_session(self).query(log.c.timestamp, log.c.value)
+            .order_by(*transaction_log_order(log))
+        ]
 
 
 class AccountProperty(db.Model):
@@ -95,6 +99,11 @@ class TrafficLog(db.Model):
     bytes_in = Column(BigInteger, nullable=False, default=0)
     bytes_out = Column(BigInteger, nullable=False, default=0)
 
+    __table_args__ = (
+        # the traffic history only covers the last days of an account
+        Index('ix_traffic_log_account_date', 'account', 'date'),
+    )
+
     def __repr__(self):
         return "<{cls} account='{obj.account}' date='{obj.date}'>".format(
             cls=type(self).__name__,
@@ -112,6 +121,12 @@ class AccountStatementLog(db.Model):
     purpose = Column(String(255), nullable=False)
     account = Column(String(16), ForeignKey('account.account'))
 
+    __table_args__ = (
+        # the finance logs are paged by the order of transaction_log
+        Index('ix_account_statement_log_account_timestamp',
+              'account', 'timestamp', 'id'),
+    )
+
 
 class AccountFeeRelation(db.Model):
     __tablename__ = 'account_fee_relation'
@@ -150,3 +165,36 @@ class TrafficQuota(db.Model):
                     cls=type(self).__name__,
                     obj=self,
                 ))
+
+
+def transaction_log(account):
+    """The fees and statements of an account merged into one selectable
+
+    The columns are the ``kind`` (``'fee'`` or ``'statement'``), the
+    ``id``, the ``timestamp`` and the ``value`` of a transaction.
+
+    :param str account: The name of the account
+    """
+    fees = select([
+        literal_column("'fee'").label('kind'),
+        FeeInfo.id.label('id'),
+        FeeInfo.timestamp.label('timestamp'),
+        (-FeeInfo.amount).label('value'),
+    ]).select_from(
+        AccountFeeRelation.__table__.join(FeeInfo.__table__)
+    ).where(AccountFeeRelation.account == account)
+
+    statements = select([
+        literal_column("'statement'").label('kind'),
+        AccountStatementLog.id.label('id'),
+        AccountStatementLog.timestamp.label('timestamp'),
+        AccountStatementLog.amount.label('value'),
+    ]).where(AccountStatementLog.account == account)
+
+    return union_all(fees, statements).alias('transaction_log')
+
+
+def transaction_log_order(log):
+    """The columns defining the chronological order of a
+    :py:func:`transaction_log`, which is unique"""
+    return log.c.timestamp, log.c.kind, log.c.id
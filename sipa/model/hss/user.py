@@ -1,22 +1,29 @@
 import logging
 from datetime import datetime, timedelta
+from decimal import Decimal, InvalidOperation
 
 from flask_babel import gettext
 from flask_login import AnonymousUserMixin
-from sqlalchemy import func
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.orm.exc import NoResultFound
 
-from sipa.model.user import BaseUser
+from sipa.model.user import BaseUser, TrafficSnapshot, FINANCE_LOG_PAGE_SIZE
 from sipa.model.fancy_property import active_prop, unsupported_prop
-from sipa.model.misc import compare_all_attributes
+from sipa.model.misc import compare_all_attributes, FinanceLogEntry, \
+    FinanceLogPage
 from sipa.model.sqlalchemy import db
 from sipa.model.hss.ldap import HssLdapConnector, change_password
-from sipa.model.hss.schema import Account, IP, AccountStatementLog, TrafficQuota
+from sipa.model.hss.schema import Account, IP, AccountStatementLog, \
+    TrafficLog, transaction_log, transaction_log_order
 from sipa.units import money
 from sipa.utils import argstr
 from sipa.utils.exceptions import InvalidCredentials
 logger = logging.getLogger(__name__)
 
+#: The number of days covered by the traffic history
+TRAFFIC_HISTORY_DAYS = 7
+
 
 class User(BaseUser):
     LdapConnector = HssLdapConnector
@@ -40,6 +47,12 @@ class User(BaseUser):
     def __eq__(self, other):
         return compare_all_attributes(self, other, ['uid', 'datasource'])
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # the ORM object is bound to the session of the current request
+        state.pop('_cached_account', None)
+        return state
+
     def __repr__(self):
         return "{}.{}({})".format(__name__, type(self).__name__, argstr(
             uid=self.uid,
@@ -85,31 +98,48 @@ class User(BaseUser):
 
     @property
     def _pg_account(self):
-        """Return the corresponding ORM Account"""
-        try:
-            return db.session.query(Account).filter_by(
-                account=self.uid
-            ).one()
-        except NoResultFound:
-            return
-        except RuntimeError:
-            logger.warning("RuntimeError caught when accessing _pg_account",
-                           extra={'data': {'user': self}})
-            return
+        """Return the corresponding ORM Account
+
+        When firstly invoked, the account is loaded together with
+        everything displayed in the usersuite and cached in
+        `self._cached_account`.  The scalar relations (access,
+        properties and traffic quota) are joined, while the ips and
+        macs are fetched by one query each, as joining several
+        collections would multiply their rows.
+        """
+        if '_cached_account' not in self.__dict__:
+            try:
+                account = db.session.query(Account).options(
+                    selectinload(Account.ips),
+                    selectinload(Account.macs),
+                    joinedload(Account.access),
+                    joinedload(Account.properties),
+                    joinedload(Account.traffic_quota),
+                ).filter_by(account=self.uid).one()
+            except NoResultFound:
+                account = None
+            except RuntimeError:
+                logger.warning("RuntimeError caught when accessing _pg_account",
+                               extra={'data': {'user': self}})
+                return
+            self._cached_account = account
+
+        return self._cached_account
 
     can_change_password = True
 
     @property
     def _pg_trafficquota(self):
-        """Return the corresponding ORM TrafficQuota for an Account"""
-        try:
-            return db.session.query(TrafficQuota).filter_by(
-                id=self._pg_account.traffic_quota_id
-            ).one()
-        except NoResultFound:
+        """Return the corresponding ORM TrafficQuota for an Account
+
+        :raises NoResultFound: if the account has no traffic quota
+        """
+        quota = self._pg_account.traffic_quota
+        if quota is None:
             logger.warning("No traffic quota object found for account %s",
                            self._pg_account.account)
-            raise
+            raise NoResultFound
+        return quota
 
     def change_password(self, old, new):
         """Change the user's password from old to new.
@@ -133,15 +163,41 @@ class User(BaseUser):
                             for day in range(7)]}
 
         """
+        return self._traffic_history(self.credit)
+
+    def load_traffic_snapshot(self):
+        credit = self.credit
+        return TrafficSnapshot(credit=credit,
+                               history=self._traffic_history(credit))
+
+    def _traffic_logs_since(self, first_date):
+        """Return the traffic logs from ``first_date`` on keyed by date
+
+        Only the requested days are fetched, so the cost doesn't grow
+        with the age of the account.
+
+        :param date first_date: The first day to fetch
+        :rtype: dict
+        """
+        logs = db.session.query(TrafficLog).filter(
+            TrafficLog.account == self.uid,
+            TrafficLog.date >= first_date,
+        )
+        return {log.date: log for log in logs}
+
+    def _traffic_history(self, credit):
+        """Return the traffic history ending with ``credit``"""
         history = []
+        today = datetime.today().date()
+        logs = self._traffic_logs_since(
+            today - timedelta(TRAFFIC_HISTORY_DAYS - 1)
+        )
 
-        for date_delta in range(-6, 1):
-            expected_date = (datetime.today() + timedelta(date_delta)).date()
-            expected_log = [l for l in self._pg_account.traffic_log
-                            if l.date == expected_date]
+        for date_delta in range(-TRAFFIC_HISTORY_DAYS + 1, 1):
+            expected_date = today + timedelta(date_delta)
             try:
-                log = expected_log.pop()
-            except IndexError:
+                log = logs[expected_date]
+            except KeyError:
                 history.append({
                     'day': expected_date.weekday(),
                     'input': 0,
@@ -159,7 +215,7 @@ class User(BaseUser):
                 })
                 # get the history from the expected_date
 
-        return self.reconstruct_credit(history, self.credit)
+        return self.reconstruct_credit(history, credit)
 
     def reconstruct_credit(self, old_history, last_credit):
         history = old_history.copy()
@@ -276,10 +332,90 @@ class User(BaseUser):
 
     finance_balance = finance_balance.fake_setter()
 
-    @property
-    def last_finance_update(self):
+    def load_last_finance_update(self):
         return db.session.query(func.max(AccountStatementLog.timestamp)).one()[0]
 
     @property
     def finance_logs(self):
         return self._pg_account.combined_transactions
+
+    def finance_log_page(self, before=None, limit=FINANCE_LOG_PAGE_SIZE):
+        """A page of the finance logs fetched in one query
+
+        The key of an entry is its position in
+        :py:func:`~sipa.model.hss.schema.transaction_log_order`, so the
+        entries before a key are selected by a filter on the order
+        instead of an offset.
+
+        The running balance is computed backwards from the newest entry
+        of the page.  For the first page, this is the sum of all
+        transactions of the account, so its query reads all of them.
+        The key of the next page carries the balance of the entries
+        before it, so older pages need no sum.  Their key filter is
+        applied inside both parts of the union, where the statements
+        are found using an index, but all transactions before the key
+        are still sorted to find the page.
+        """
+        log = transaction_log(self.uid)
+        order = transaction_log_order(log)
+        if before is None:
+            everything = transaction_log(self.uid)
+            total = select([func.coalesce(func.sum(everything.c.value), 0)])
+            query = db.session.query(log, total.as_scalar().label('total'))
+        else:
+            key, balance = parse_finance_log_key(before)
+            query = db.session.query(log).filter(tuple_(*order) < key)
+        rows = query.order_by(*(column.desc() for column in order)) \
+            .limit(limit + 1).all()
+
+        if before is None:
+            balance = rows[0].total if rows else 0
+
+        entries = []
+        for row in rows[:limit]:
+            entries.append(FinanceLogEntry(row.timestamp, row.value, balance))
+            balance -= row.value
+
+        next_key = None
+        if len(rows) > limit:
+            next_key = finance_log_key(rows[limit - 1], balance)
+
+        return FinanceLogPage(entries=entries[::-1], next_key=next_key)
+
+
+#: The format of the timestamp in a finance log key
+FINANCE_LOG_KEY_TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def finance_log_key(row, balance):
+    """Return the key of a row of the transaction log
+
+    :param row: The oldest row of a page
+    :param balance: The balance of the transactions before ``row``
+    :rtype: str
+    """
+    return "{},{},{},{}".format(
+        row.timestamp.strftime(FINANCE_LOG_KEY_TIMESTAMP_FORMAT),
+        row.kind,
+        row.id,
+        balance,
+    )
+
+
+def parse_finance_log_key(key):
+    """Parse a key created by :py:func:`finance_log_key`
+
+    :returns: The ``(timestamp, kind, id)`` triple and the balance
+    :raises ValueError: if the key is malformed
+    """
+    try:
+        timestamp, kind, id_, balance = key.split(',')
+        if kind not in ('fee', 'statement'):
+            raise ValueError
+        balance = Decimal(balance)
+        if not balance.is_finite():
+            raise ValueError
+        return ((datetime.strptime(timestamp, FINANCE_LOG_KEY_TIMESTAMP_FORMAT),
+                 kind, int(id_)), balance)
+    except (ValueError, InvalidOperation):
+        raise ValueError("Invalid finance log key {!r}".format(key)) from None
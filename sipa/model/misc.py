@@ -2,6 +2,14 @@ from collections import namedtuple
 
 TransactionTuple = namedtuple('Transaction', ['datum', 'value'])
 
+#: A transaction together with the balance after it
+FinanceLogEntry = namedtuple('FinanceLogEntry', ['datum', 'value', 'balance'])
+
+#: One page of finance log entries in chronological order.  The first
+#: page holds the newest entries, ``next_key`` selects the next (older)
+#: page, it is ``None`` on the last one.
+FinanceLogPage = namedtuple('FinanceLogPage', ['entries', 'next_key'])
+
 
 def compare_all_attributes(one, other, attr_list):
     return all(getattr(one, attr) == getattr(other, attr)
@@ -50,6 +50,15 @@ class User(BaseUser):
             ip=self._ip,
         ))
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        del state['config']
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self.config = config
+
     can_change_password = True
 
     login_list = {
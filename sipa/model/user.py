@@ -4,7 +4,11 @@
 from abc import ABCMeta, abstractmethod
 from collections import namedtuple
 
+from flask import current_app
+
 from sipa.model.fancy_property import active_prop
+from sipa.model.misc import FinanceLogEntry, FinanceLogPage
+from sipa.utils.cache import RequestCache
 
 
 # noinspection PyMethodMayBeStatic
@@ -22,6 +26,17 @@ class AuthenticatedUserMixin:
 
 Row = namedtuple('Row', ['description', 'property'])
 
+#: The credit and the traffic history of a user as loaded together by
+#: :py:meth:`BaseUser.load_traffic_snapshot`
+TrafficSnapshot = namedtuple('TrafficSnapshot', ['credit', 'history'])
+
+#: The traffic snapshots of the current request, see
+#: :py:attr:`BaseUser.traffic`.  Registered by the `Backends` extension.
+traffic_cache = RequestCache('traffic_snapshots')
+
+#: The number of finance log entries shown on one page
+FINANCE_LOG_PAGE_SIZE = 50
+
 
 class BaseUser(AuthenticatedUserMixin, metaclass=ABCMeta):
     """Abstract base class defining what a user must have in order to
@@ -49,6 +64,19 @@ class BaseUser(AuthenticatedUserMixin, metaclass=ABCMeta):
 
     datasource = None
 
+    def __getstate__(self):
+        """Return the state of the user as stored in a snapshot.
+
+        Override this if the user holds something bound to the current
+        request or process, like ORM objects or proxies, and restore
+        it in :meth:`__setstate__`.  See
+        :py:class:`~sipa.model.user_cache.UserSnapshotCache`.
+        """
+        return self.__dict__.copy()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
     def get_id(self):
         """This method is Required by flask-login.
 
@@ -141,6 +169,31 @@ class BaseUser(AuthenticatedUserMixin, metaclass=ABCMeta):
         """
         pass
 
+    @property
+    def traffic(self):
+        """The credit and traffic history of this user
+
+        The snapshot is loaded once per request and user, so every
+        consumer (the gauge, the traffic table, the charts, …) sees the
+        same data without querying the backend again.
+
+        :rtype: :py:data:`TrafficSnapshot`
+        """
+        return traffic_cache.get_or_create(
+            (self.datasource.name if self.datasource else None, self.uid),
+            self.load_traffic_snapshot,
+        )
+
+    def load_traffic_snapshot(self):
+        """Load :py:attr:`credit` and :py:attr:`traffic_history`
+
+        Override this if both can be computed together more cheaply.
+
+        :rtype: :py:data:`TrafficSnapshot`
+        """
+        return TrafficSnapshot(credit=self.credit,
+                               history=self.traffic_history)
+
     def generate_rows(self, description_dict):
         for key, val in description_dict.items():
             yield Row(description=val, property=self.__getattribute__(key))
@@ -281,12 +334,62 @@ class BaseUser(AuthenticatedUserMixin, metaclass=ABCMeta):
     def last_finance_update(self):
         """The last update of the finance data.
 
+        The date is the same for every user of the datasource, so it
+        is cached in the process for ``FINANCE_UPDATE_TTL`` seconds
+        and loaded by only one request at a time.
+
+        :rtype: date or None
+        """
+        cache = current_app.extensions.get('finance_update_cache')
+        if cache is None:
+            return self.load_last_finance_update()
+
+        return cache.get_or_create(
+            self.datasource.name if self.datasource else None,
+            self.load_last_finance_update,
+        )
+
+    def load_last_finance_update(self):
+        """Load :py:attr:`last_finance_update`
+
         Defaulting to None, may be overridden.
 
         :rtype: date or None
         """
         return None
 
+    def finance_log_page(self, before=None, limit=FINANCE_LOG_PAGE_SIZE):
+        """A page of the finance logs together with the balance after
+        every transaction.
+
+        The pages go back in time starting with the newest entries,
+        the entries of a page are in chronological order.
+
+        This default pages the chronologically ordered
+        ``finance_logs`` in python, using the position of an entry as
+        the key.  Override it if the logs can be paged by the
+        database.
+
+        :param str before: The ``next_key`` of the previous page, or
+            ``None`` for the newest entries
+        :param int limit: The maximal number of entries
+        :raises ValueError: if ``before`` is not a valid key
+        :rtype: :py:class:`~sipa.model.misc.FinanceLogPage`
+        """
+        entries = []
+        balance = 0
+        for datum, value in self.finance_logs:
+            balance += value
+            entries.append(FinanceLogEntry(datum, value, balance))
+
+        end = len(entries) if before is None else int(before)
+        if not 0 <= end <= len(entries):
+            raise ValueError("Invalid finance log key {!r}".format(before))
+        start = max(end - limit, 0)
+
+        return FinanceLogPage(entries=entries[start:end],
+                              next_key=str(start) if start else None)
+
 
 class BaseUserDB(metaclass=ABCMeta):
     """An abstract base class defining an interface for a user's
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Caching of user objects across requests
+"""
+import logging
+import pickle
+
+from sipa.model.user import BaseUser
+from sipa.utils import argstr
+from sipa.utils.cache import ClientCache, MemoryCache
+
+logger = logging.getLogger(__name__)
+
+
+class UserSnapshotCache:
+    """A cache of user snapshots shared between requests.
+
+    Looking up a user by its uid is needed on every request and might
+    involve LDAP, SQL or HTTP calls.  This cache stores a snapshot of
+    the user, which is the pickled result of ``user.__getstate__()``,
+    and restores a fresh user object from it on a hit.  This way, no
+    state leaks from one request into another.
+
+    The storage is done by a pluggable ``backend`` as configured by
+    :py:meth:`init_app`:
+
+    * ``USER_CACHE_TTL``: The seconds a snapshot stays valid.  If not
+      set, caching is disabled.
+    * ``USER_CACHE_MAX_SIZE``: The maximum number of snapshots kept by
+      the in-process :py:class:`~sipa.utils.cache.MemoryCache`
+    * ``USER_CACHE_CLIENT``: A client in the sense of
+      :py:class:`~sipa.utils.cache.ClientCache` to share the snapshots
+      between processes instead.
+
+    Whenever a user is changed, the snapshot has to be dropped using
+    :py:meth:`invalidate`.
+
+    :py:attr:`hits` and :py:attr:`misses` count the lookups over the
+    lifetime of the process.
+    """
+    def __init__(self, backend=None):
+        #: The storage, ``None`` if caching is disabled
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            backend=self.backend,
+            hits=self.hits,
+            misses=self.misses,
+        ))
+
+    def init_app(self, app):
+        ttl = app.config.get('USER_CACHE_TTL')
+        if not ttl:
+            self.backend = None
+        elif app.config.get('USER_CACHE_CLIENT') is not None:
+            self.backend = ClientCache(app.config['USER_CACHE_CLIENT'],
+                                       ttl=ttl, prefix='sipa_user:')
+        else:
+            self.backend = MemoryCache(
+                max_size=app.config.get('USER_CACHE_MAX_SIZE', 1024),
+                ttl=ttl,
+            )
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(datasource, uid):
+        return "{}:{}".format(datasource.name, uid)
+
+    def get_or_create(self, datasource, uid, creator):
+        """Return the user ``uid`` of ``datasource`` restored from its
+        snapshot or create it using ``creator()``.
+
+        Only instances of :py:class:`~sipa.model.user.BaseUser` are
+        cached, so a lookup not resulting in a user (like an
+        :py:class:`~flask_login.AnonymousUserMixin`) will be repeated
+        the next time.
+
+        :param datasource: The datasource of the user
+        :param str uid: The uid of the user
+        :param creator: A callable returning the user
+        """
+        if self.backend is None:
+            return creator()
+
+        key = self._key(datasource, uid)
+        snapshot = self.backend.get(key)
+        if snapshot is not None:
+            try:
+                user = self._restore(datasource.user_class, snapshot)
+            except Exception:
+                logger.warning("Could not restore user snapshot of %s", key,
+                               exc_info=True)
+                self.backend.delete(key)
+            else:
+                self.hits += 1
+                return user
+
+        self.misses += 1
+        user = creator()
+        if isinstance(user, BaseUser):
+            try:
+                self.backend.set(key, pickle.dumps(user.__getstate__()))
+            except (pickle.PicklingError, TypeError, AttributeError):
+                logger.warning("Could not create user snapshot of %s", key,
+                               exc_info=True)
+        return user
+
+    def invalidate(self, datasource, uid):
+        """Drop the snapshot of the user ``uid`` of ``datasource``"""
+        if self.backend is not None:
+            self.backend.delete(self._key(datasource, uid))
+
+    @staticmethod
+    def _restore(user_class, snapshot):
+        user = user_class.__new__(user_class)
+        user.__setstate__(pickle.loads(snapshot))
+        return user
@@ -1,10 +1,16 @@
 # -*- coding: utf-8 -*-
 import logging
+from collections import Counter
+from contextlib import contextmanager
+from threading import Lock
+from time import monotonic
 
 from flask.globals import current_app
 import ldap3
+from ldap3.utils.dn import to_dn
 from werkzeug.local import LocalProxy
 
+from sipa.utils import argstr
 from sipa.utils.exceptions import UserNotFound, PasswordInvalid, \
     LDAPConnectionError, InvalidConfiguration
 
@@ -21,11 +27,168 @@ def init_ldap(app):
             'search_user_base': app.config['WU_LDAP_SEARCH_USER_BASE'],
             'search_group_base': app.config['WU_LDAP_SEARCH_GROUP_BASE']
         }
+        app.extensions['ldap_pool'] = LdapConnectionPool(
+            connection_factory=lambda: LdapConnector(None),
+            max_size=int(app.config['WU_LDAP_POOL_SIZE']),
+            idle_timeout=app.config['WU_LDAP_POOL_IDLE_TIMEOUT'],
+            check_interval=app.config['WU_LDAP_POOL_CHECK_INTERVAL'],
+        )
     except KeyError as exception:
         raise InvalidConfiguration(*exception.args)
 
+    # Shared by all connections, so the schema is only fetched once
+    app.extensions['ldap']['server'] = ldap3.Server(
+        host=app.extensions['ldap']['host'],
+        port=app.extensions['ldap']['port'],
+        get_info=ldap3.SCHEMA,
+        tls=None,  # accept any certificate
+        connect_timeout=5,
+    )
+
 
 CONF = LocalProxy(lambda: current_app.extensions['ldap'])
+POOL = LocalProxy(lambda: current_app.extensions['ldap_pool'])
+
+
+class LdapConnectionPool:
+    """A pool of system-bound LDAP connections.
+
+    Connections are created using ``connection_factory`` and handed
+    out by :py:meth:`connection`.  After usage, at most ``max_size``
+    of them are kept open to be reused by later requests, surplus
+    connections get closed.
+
+    Before a connection is reused, it is checked for health:
+
+    * closed or unbound connections are discarded
+    * connections idle for longer than ``idle_timeout`` seconds are
+      discarded, so we don't run into the server's idle timeout
+    * connections idle for longer than ``check_interval`` seconds are
+      probed with a base search on the root DSE
+
+    A connection raising an :py:class:`ldap3.LDAPCommunicationError`
+    while being used is discarded as well.
+
+    **Usage:**
+
+    >>> pool = LdapConnectionPool(lambda: LdapConnector(None))
+    >>> with pool.connection() as conn:
+    ...     conn.search(…)
+    """
+    def __init__(self, connection_factory, max_size=4, idle_timeout=300,
+                 check_interval=30):
+        self.connection_factory = connection_factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.check_interval = check_interval
+
+        #: The idle connections as ``(connection, released_at)`` tuples,
+        #: the most recently released one last
+        self._idle = []
+        self._lock = Lock()
+        #: Counts of ``created``, ``reused``, ``discarded`` and
+        #: ``overflow`` connections
+        self.stats = Counter()
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            max_size=self.max_size,
+            idle_timeout=self.idle_timeout,
+            check_interval=self.check_interval,
+            idle=len(self._idle),
+        ))
+
+    @property
+    def metrics(self):
+        """The pool statistics as a dict
+
+        Contains the number of ``idle`` connections and the counters
+        of :py:attr:`stats`.
+        """
+        metrics = {key: self.stats[key]
+                   for key in ('created', 'reused', 'discarded', 'overflow')}
+        metrics['idle'] = len(self._idle)
+        return metrics
+
+    @contextmanager
+    def connection(self):
+        """Provide a bound connection and return it to the pool
+        afterwards."""
+        connection = self._acquire()
+        try:
+            yield connection
+        except ldap3.LDAPCommunicationError:
+            self._discard(connection)
+            raise
+        except Exception:
+            self._release(connection)
+            raise
+        else:
+            self._release(connection)
+
+    def clear(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for connection, _ in idle:
+            self._close(connection)
+
+    def _acquire(self):
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                connection, released_at = self._idle.pop()
+
+            if self._is_healthy(connection, monotonic() - released_at):
+                self.stats['reused'] += 1
+                return connection
+            self._discard(connection)
+
+        self.stats['created'] += 1
+        return self.connection_factory()
+
+    def _release(self, connection):
+        if connection.closed or not connection.bound:
+            self._discard(connection)
+            return
+
+        with self._lock:
+            if len(self._idle) < self.max_size:
+                self._idle.append((connection, monotonic()))
+                return
+
+        self.stats['overflow'] += 1
+        self._close(connection)
+
+    def _discard(self, connection):
+        self.stats['discarded'] += 1
+        self._close(connection)
+
+    def _is_healthy(self, connection, idle_time):
+        if connection.closed or not connection.bound:
+            return False
+        if idle_time > self.idle_timeout:
+            return False
+        if idle_time > self.check_interval:
+            try:
+                connection.search(search_base='',
+                                  search_filter='(objectClass=*)',
+                                  search_scope=ldap3.BASE,
+                                  attributes=[])
+            except ldap3.LDAPCommunicationError:
+                return False
+            except ldap3.LDAPException:
+                # the server answered, which is all we wanted to know
+                pass
+        return True
+
+    @staticmethod
+    def _close(connection):
+        try:
+            connection.unbind()
+        except ldap3.LDAPException:
+            pass
 
 
 class LdapConnector(ldap3.Connection):
@@ -50,18 +213,18 @@ class LdapConnector(ldap3.Connection):
                                            CONF['search_user_base'])
             bind_password = self.password
 
-        self.server = ldap3.Server(host=CONF['host'],
-                                   port=CONF['port'],
-                                   get_info=ldap3.SCHEMA,
-                                   tls=None,  # accept any certificate
-                                   connect_timeout=5)
+        # the schema of the shared server only has to be read once
+        self.server = CONF['server']
         try:
             super().__init__(server=self.server,
                              user=bind_user,
                              password=bind_password,
                              check_names=True,
                              raise_exceptions=True,
-                             auto_bind=ldap3.AUTO_BIND_TLS_BEFORE_BIND)
+                             auto_bind=ldap3.AUTO_BIND_NONE)
+            self.open(read_server_info=False)
+            self.start_tls(read_server_info=False)
+            self.bind(read_server_info=self.server.schema is None)
         except ldap3.LDAPInvalidCredentialsResult:
             raise PasswordInvalid
         except ldap3.LDAPUnwillingToPerformResult:
@@ -71,35 +234,80 @@ class LdapConnector(ldap3.Connection):
             raise LDAPConnectionError
 
     @staticmethod
-    def fetch_user(username):
+    def fetch_user(username, groups=()):
         """Fetch a user by his username from LDAP.
         This method does not check the authenticity of the requested user!
 
         Returns a formatted dict with the LDAP dn, username and real name.
         If the username was not found, returns None.
+
+        If ``groups`` are given, the names of those groups the user is
+        a member of are fetched in the same search and put into the
+        dict at ``'groups'``.
+
+        :param str username: The uid of the user
+        :param groups: The ``cn`` s of the groups to check
         """
-        with LdapConnector(None) as l:
-            l.search(search_base=CONF['search_user_base'],
-                     search_scope=ldap3.SUBTREE,
-                     search_filter="(uid={})".format(username),
-                     attributes=['uid', 'gecos', 'mail'])
-
-        if l.response:
-            user = l.response.pop()
-            attributes = user['attributes']
-            userdict = {
-                'dn': user['dn'],
-                'uid': attributes['uid'].pop(),
-                'name': attributes['gecos'],
-                'mail': None
-            }
+        user_base = CONF['search_user_base']
+        user_filter = "(uid={})".format(username)
+        attributes = ['uid', 'gecos', 'mail']
 
-            # If the user has mail set, put it in the dict
-            if 'mail' in attributes:
-                userdict['mail'] = attributes['mail'].pop()
+        searches = [(user_base, user_filter, attributes)]
+        if groups:
+            group_base = CONF['search_group_base']
+            search_base = common_base(user_base, group_base)
+            if search_base:
+                searches = [(search_base,
+                             "(|{}{})".format(user_filter,
+                                              group_filter(username, groups)),
+                             attributes + ['cn'])]
+            else:
+                # the bases don't share a subtree
+                searches.append((group_base, group_filter(username, groups),
+                                 ['cn']))
 
-            return userdict
-        return None
+        response = []
+        with POOL.connection() as l:
+            for search_base, search_filter, search_attributes in searches:
+                l.search(search_base=search_base,
+                         search_scope=ldap3.SUBTREE,
+                         search_filter=search_filter,
+                         attributes=search_attributes)
+                response.extend(l.response)
+
+        user_entries = [
+            entry for entry in response
+            if is_within(entry['dn'], user_base)
+            and username.lower() in (uid.lower() for uid
+                                     in entry['attributes'].get('uid', []))
+        ]
+        if not user_entries:
+            return None
+
+        user = user_entries.pop()
+        attributes = user['attributes']
+        userdict = {
+            'dn': user['dn'],
+            'uid': attributes['uid'].pop(),
+            'name': attributes['gecos'],
+            'mail': None
+        }
+
+        # If the user has mail set, put it in the dict
+        if 'mail' in attributes:
+            userdict['mail'] = attributes['mail'].pop()
+
+        if groups:
+            userdict['groups'] = {
+                cn
+                for entry in response
+                if entry is not user
+                and is_within(entry['dn'], CONF['search_group_base'])
+                for cn in entry['attributes'].get('cn', [])
+                if cn in groups
+            }
+
+        return userdict
 
     def get_dn(self):
         """who_am_i returns a string of the form 'dn:<full dn>',
@@ -108,11 +316,52 @@ class LdapConnector(ldap3.Connection):
         return self.extend.standard.who_am_i()[3:]
 
 
+def _dn_components(dn):
+    """Return the RDNs of ``dn`` as normalized ``(type, value)``
+    tuples, the topmost last."""
+    return [(attr.lower(), value.lower())
+            for attr, value in to_dn(dn, decompose=True, remove_space=True)]
+
+
+def is_within(dn, base):
+    """Return whether ``dn`` is ``base`` or lies beneath it"""
+    base_components = _dn_components(base)
+    if not base_components:
+        return True
+    return _dn_components(dn)[-len(base_components):] == base_components
+
+
+def common_base(*dns):
+    """Return the deepest DN containing all ``dns``
+
+    Returns an empty string if they don't share any RDN.
+    """
+    reversed_components = [list(reversed(_dn_components(dn))) for dn in dns]
+    depth = 0
+    for components in zip(*reversed_components):
+        if any(rdn != components[0] for rdn in components):
+            break
+        depth += 1
+
+    if not depth:
+        return ""
+    return ",".join(to_dn(dns[0], remove_space=True)[-depth:])
+
+
+def group_filter(username, groups):
+    """Return a filter matching all ``groups`` having ``username``
+    as a member"""
+    return ("(&(objectClass=groupOfNames)"
+            "(memberuid={})"
+            "(|{}))").format(username,
+                             "".join("(cn={})".format(group) for group in groups))
+
+
 def search_in_group(username, group):
     """Searches for the given user in the given LDAP group memberuid list.
     This replaces the previous usage of hostflags.
     """
-    with LdapConnector(username) as l:
+    with POOL.connection() as l:
         l.search(search_base=CONF['search_group_base'],
                  search_scope=ldap3.SUBTREE,
                  search_filter=("(&(objectClass=groupOfNames)"
@@ -1,6 +1,7 @@
 # -*- coding: utf-8; -*-
-from sqlalchemy import (Column, Index, Integer, String,
-                        text, Text, ForeignKey, DECIMAL, BigInteger, Date, case, or_)
+from sqlalchemy import (Column, Index, Integer, String, text, Text,
+                        ForeignKey, DECIMAL, BigInteger, Date, and_, case,
+                        func, or_, select, union_all)
 from sqlalchemy.orm import relationship, column_property, object_session
 
 from sipa.model.sqlalchemy import db
@@ -59,6 +60,37 @@ class Nutzer(db.Model):
                            self.wheim_id)
             return ""
 
+    def _transaction_rows(self):
+        """Return the `Buchung` rows concerning the Nutzer.
+
+        Instead of filtering on `haben_uid OR soll_uid`, which cannot
+        use an index, both sides are selected separately and glued
+        together using `UNION ALL`.  A row carrying the `nutzer_id`
+        in both columns is only selected by the `haben_uid` side.
+
+        The value is corrected by negation depending on where the
+        `nutzer_id` appears, see :py:attr:`transactions`.
+
+        :return: An aliased selectable with the columns `datum` and
+            `wert`, the latter being cents.
+        """
+        on_haben = select([
+            Buchung.datum.label('datum'),
+            (-Buchung.wert).label('wert'),
+        ]).where(Buchung.haben_uid == self.nutzer_id)
+
+        on_soll = select([
+            Buchung.datum.label('datum'),
+            case([(Buchung.haben_uid.is_(None), Buchung.wert)],
+                 else_=(-Buchung.wert)).label('wert'),
+        ]).where(and_(
+            Buchung.soll_uid == self.nutzer_id,
+            or_(Buchung.haben_uid.is_(None),
+                Buchung.haben_uid != self.nutzer_id),
+        ))
+
+        return union_all(on_haben, on_soll).alias('transactions')
+
     @property
     def transactions(self):
         """The transactions of the Nutzer.
@@ -71,18 +103,24 @@ class Nutzer(db.Model):
         value being euros.
         """
         session = object_session(self)
+        rows = self._transaction_rows()
         return [
             TransactionTuple(*result) for result in
-            session.query(
-                Buchung.datum,
-                case([(Buchung.haben_uid.is_(None), Buchung.wert)],
-                     else_=(-Buchung.wert)) / 100.0,
-            ).filter(
-                or_(Buchung.haben_uid == self.nutzer_id,
-                    Buchung.soll_uid == self.nutzer_id)
-            ).order_by(Buchung.datum.asc()).all()
+            session.query(rows.c.datum, rows.c.wert / 100.0)
+            .order_by(rows.c.datum.asc()).all()
         ]
 
+    @property
+    def balance(self):
+        """The sum of the :py:attr:`transactions` in euros.
+
+        The sum is calculated by the database.
+        """
+        session = object_session(self)
+        rows = self._transaction_rows()
+        cents = session.query(func.coalesce(func.sum(rows.c.wert), 0)).scalar()
+        return cents / 100.0
+
 
 class Computer(db.Model):
     __tablename__ = 'computer'
@@ -110,6 +148,9 @@ class Credit(db.Model):
 class Traffic(db.Model):
     __tablename__ = 'tuext'
     __bind_key__ = 'traffic'
+    __table_args__ = (
+        Index('ip_timetag', 'ip', 'timetag'),
+    )
 
     timetag = Column(BigInteger(), primary_key=True)
     ip = Column(String(15), nullable=False, index=True, primary_key=True)
@@ -130,8 +171,8 @@ class Buchung(db.Model):
     wert = Column(Integer, nullable=False, default=0)
     bes = Column(Text)
 
-    soll_uid = Column(Integer)
-    haben_uid = Column(Integer)
+    soll_uid = Column(Integer, index=True)
+    haben_uid = Column(Integer, index=True)
 
     def __repr__(self):
         return (
@@ -11,7 +11,7 @@ from sqlalchemy import func
 from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm.exc import NoResultFound
 
-from sipa.model.user import BaseUser, BaseUserDB
+from sipa.model.user import BaseUser, BaseUserDB, TrafficSnapshot
 from sipa.model.fancy_property import active_prop, connection_dependent
 from sipa.model.wu.database_utils import STATUS, ACTIVE_STATUS
 from sipa.model.wu.ldap_utils import LdapConnector, change_email, \
@@ -33,10 +33,13 @@ class User(BaseUser):
     the terms 'uid' and 'username' refer to the same thing.
     """
 
-    def __init__(self, uid, realname, mail):
+    #: The LDAP groups relevant for :py:meth:`define_group`
+    LDAP_GROUPS = ('Aktiv', 'Exaktiv')
+
+    def __init__(self, uid, realname, mail, ldap_groups=None):
         super().__init__(uid)
         self._realname = realname
-        self.group = self.define_group()
+        self.group = self.define_group(ldap_groups)
         self._mail = mail
         self._userdb = UserDB(self)
 
@@ -50,14 +53,35 @@ class User(BaseUser):
     def __str__(self):
         return "User {} ({}), {}".format(self._realname, self.uid, self.group)
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # the ORM object is bound to the session of the current request
+        state.pop('_cached_nutzer', None)
+        del state['_userdb']
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        self._userdb = UserDB(self)
+
     can_change_password = True
 
-    def define_group(self):
+    def define_group(self, ldap_groups=None):
         """Define a user group from the LDAP group
+
+        :param ldap_groups: The names of the LDAP groups the user is a
+            member of as fetched by
+            :py:meth:`~sipa.model.wu.ldap_utils.LdapConnector.fetch_user`.
+            If ``None``, LDAP is searched for every group.
         """
-        if search_in_group(self.uid, 'Aktiv'):
+        def is_member(group):
+            if ldap_groups is None:
+                return search_in_group(self.uid, group)
+            return group in ldap_groups
+
+        if is_member('Aktiv'):
             return 'active'
-        elif search_in_group(self.uid, 'Exaktiv'):
+        elif is_member('Exaktiv'):
             return 'exactive'
         return 'passive'
 
@@ -66,9 +90,10 @@ class User(BaseUser):
         """Static method for flask-login user_loader,
         used before _every_ request.
         """
-        user = LdapConnector.fetch_user(username)
+        user = LdapConnector.fetch_user(username, groups=cls.LDAP_GROUPS)
         if user:
-            return cls(user['uid'], user['name'], user['mail'], **kwargs)
+            return cls(user['uid'], user['name'], user['mail'],
+                       ldap_groups=user['groups'], **kwargs)
         return AnonymousUserMixin()
 
     @classmethod
@@ -149,36 +174,75 @@ class User(BaseUser):
         return self._cached_nutzer
 
     @property
-    def traffic_history(self):
-        traffic_history = []
+    def _accountable_ips(self):
+        return [c.c_ip for c in self._nutzer.computer]
+
+    def _traffic_by_timetag(self, timetags):
+        """Return the summed up traffic of the user's ips per timetag.
+
+        The traffic of all given ``timetags`` is fetched in one
+        grouped query.
+
+        :param timetags: The timetags to fetch the traffic for
+        :return: A dict ``timetag → (input, output)`` containing the
+            timetags with traffic
+        :rtype: dict
+        """
+        accountable_ips = self._accountable_ips
+        if not timetags or not accountable_ips:
+            return {}
 
-        credit_entries = reversed(
+        rows = (db.session.query(Traffic.timetag,
+                                 func.sum(Traffic.input),
+                                 func.sum(Traffic.output))
+                .filter(Traffic.timetag.between(min(timetags), max(timetags)))
+                .filter(Traffic.ip.in_(accountable_ips))
+                .group_by(Traffic.timetag)
+                .all())
+
+        return {timetag: (input or 0, output or 0)
+                for timetag, input, output in rows}
+
+    @property
+    def traffic_history(self):
+        credit_entries = list(reversed(
             db.session.query(Credit)
             .filter_by(user_id=self._nutzer.nutzer_id)
             .order_by(Credit.timetag.desc())
             .limit(7).all()
-        )
+        ))
 
-        accountable_ips = [c.c_ip for c in self._nutzer.computer]
+        traffic = self._traffic_by_timetag(
+            [credit_entry.timetag for credit_entry in credit_entries]
+        )
 
+        traffic_history = []
         for credit_entry in credit_entries:
-            traffic_entries = (db.session.query(Traffic)
-                               .filter_by(timetag=credit_entry.timetag)
-                               .filter(Traffic.ip.in_(accountable_ips))
-                               .all()) if accountable_ips else []
+            input, output = traffic.get(credit_entry.timetag, (0, 0))
 
             traffic_history.append({
                 'day': (datetime.today() + timedelta(
                     days=credit_entry.timetag - timetag_today()
                 )).weekday(),
-                'input': sum(t.input for t in traffic_entries),
-                'output': sum(t.output for t in traffic_entries),
-                'throughput': sum(t.overall for t in traffic_entries),
+                'input': input,
+                'output': output,
+                'throughput': input + output,
                 'credit': credit_entry.amount,
             })
 
         return traffic_history
 
+    def load_traffic_snapshot(self):
+        history = self.traffic_history
+        if not history:
+            return TrafficSnapshot(credit=self.credit, history=history)
+
+        # The latest entry holds the latest credit and the traffic of
+        # that day, which is exactly what `credit` computes.
+        today = history[-1]
+        return TrafficSnapshot(credit=today['credit'] - today['throughput'],
+                               history=history)
+
     @property
     def credit(self):
         """Return the current credit that is left
@@ -193,16 +257,9 @@ class User(BaseUser):
         credit = latest_credit_entry.amount
         today = latest_credit_entry.timetag
 
-        accountable_ips = [c.c_ip for c in self._nutzer.computer]
-
-        traffic_today = sum(
-            t.overall for t
-            in db.session.query(Traffic)
-            .filter_by(timetag=today)
-            .filter(Traffic.ip.in_(accountable_ips))
-        ) if accountable_ips else 0
+        input, output = self._traffic_by_timetag([today]).get(today, (0, 0))
 
-        return credit - traffic_today
+        return credit - (input + output)
 
     max_credit = 63 * 1024 * 1024
     daily_credit = 3 * 1024 * 1024
@@ -330,12 +387,11 @@ class User(BaseUser):
     @active_prop
     @money
     def finance_balance(self):
-        return sum(t.value for t in self._nutzer.transactions)
+        return self._nutzer.balance
 
     finance_balance = finance_balance.fake_setter()
 
-    @property
-    def last_finance_update(self):
+    def load_last_finance_update(self):
         """Return an educated guess for the last finance update.
 
         It is based on the highest date in the database.  The only
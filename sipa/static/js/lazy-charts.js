@@ -0,0 +1,19 @@
+/* Load the charts of all figures having a `data-chart-src` after the
+ * page has been rendered and inline them, so the pygal tooltips work.
+ */
+$(function () {
+    'use strict';
+
+    $('figure[data-chart-src]').each(function () {
+        var figure = this;
+
+        $.get($(figure).data('chart-src'), null, null, 'text').done(function (svg) {
+            figure.innerHTML = svg;
+
+            var chart = figure.querySelector('.pygal-chart');
+            if (chart && window.pygal && window.pygal.init) {
+                window.pygal.init(chart);
+            }
+        });
+    });
+});
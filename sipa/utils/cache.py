@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+"""
+Caching utilities
+"""
+
+import logging
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from flask import g, has_app_context
+
+from sipa.utils import argstr
+
+logger = logging.getLogger(__name__)
+
+_missing = object()
+
+
+class RequestCache:
+    """A cache living on :py:obj:`flask.g` for the duration of one
+    request.
+
+    Expensive lookups (like resolving the user behind an ip) are
+    computed at most once per key and request.  Outside of an app
+    context, nothing is cached.
+
+    The store is dropped in a ``teardown_request`` handler, so the
+    extension has to be registered using :py:meth:`init_app`.
+
+    :py:attr:`hits` and :py:attr:`misses` count the lookups over the
+    lifetime of the process.
+
+    **Usage:**
+
+    >>> cache = RequestCache('user_cache')
+    >>> cache.init_app(app)
+    >>> cache.get_or_create(('ip', ip), lambda: expensive_lookup(ip))
+    """
+    def __init__(self, name):
+        #: The name of the attribute on ``g`` holding the store
+        self.name = "_{}".format(name)
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            name=self.name,
+            hits=self.hits,
+            misses=self.misses,
+        ))
+
+    def init_app(self, app):
+        app.teardown_request(self.clear)
+
+    def clear(self, exception=None):
+        """Drop the store of the current request"""
+        if has_app_context() and self.name in g:
+            delattr(g, self.name)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, key, creator):
+        """Return the value cached at ``key`` or cache ``creator()``.
+
+        Exceptions raised by ``creator`` are not cached.
+
+        :param key: A hashable key
+        :param creator: A callable computing the value
+        """
+        if not has_app_context():
+            return creator()
+
+        store = g.get(self.name)
+        if store is None:
+            store = {}
+            setattr(g, self.name, store)
+
+        try:
+            value = store[key]
+        except KeyError:
+            self.misses += 1
+            value = store[key] = creator()
+        else:
+            self.hits += 1
+
+        return value
+
+
+class MemoryCache:
+    """An in-process cache evicting the least recently used entry
+    when growing beyond ``max_size`` entries.
+
+    Entries expire ``ttl`` seconds after they have been set, or never
+    if ``ttl`` is ``None``.
+
+    :py:attr:`hits` and :py:attr:`misses` count the lookups.
+
+    The interface is a subset of the one of
+    :py:mod:`werkzeug.contrib.cache`, so it can be exchanged with
+    :py:class:`ClientCache`.
+
+    **Usage:**
+
+    >>> cache = MemoryCache(max_size=2, ttl=60)
+    >>> cache.set('foo', 42)
+    >>> cache.get('foo')
+    42
+    >>> cache.get_or_create('bar', lambda: expensive_lookup())
+    """
+    def __init__(self, max_size=1024, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        #: ``key → (expires_at, value)``, the least recently used first
+        self._entries = OrderedDict()
+        self._lock = Lock()
+        #: ``key → Lock`` held while ``creator()`` of the key is running
+        self._flights = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            max_size=self.max_size,
+            ttl=self.ttl,
+            hits=self.hits,
+            misses=self.misses,
+        ))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, key):
+        """Return the value at ``key`` or ``_missing`` without counting
+        the lookup"""
+        with self._lock:
+            try:
+                expires_at, value = self._entries[key]
+            except KeyError:
+                return _missing
+
+            if expires_at is not None and expires_at <= monotonic():
+                del self._entries[key]
+                return _missing
+
+            self._entries.move_to_end(key)
+            return value
+
+    def get(self, key, default=None):
+        """Return the value at ``key`` or ``default`` if it is missing
+        or expired"""
+        value = self._lookup(key)
+        if value is _missing:
+            self.misses += 1
+            return default
+
+        self.hits += 1
+        return value
+
+    def get_or_create(self, key, creator):
+        """Return the value at ``key`` or cache ``creator()``.
+
+        Concurrent misses of the same key only call ``creator`` once:
+        the other threads wait for its result instead of computing it
+        themselves.  Exceptions raised by ``creator`` are not cached.
+
+        :param key: A hashable key
+        :param creator: A callable computing the value
+        """
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+
+        with self._lock:
+            flight = self._flights.setdefault(key, Lock())
+
+        try:
+            with flight:
+                value = self._lookup(key)
+                if value is _missing:
+                    value = creator()
+                    self.set(key, value)
+        finally:
+            with self._lock:
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+        return value
+
+    def set(self, key, value):
+        expires_at = None if self.ttl is None else monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ClientCache:
+    """Adapter for a cache client shared between processes
+
+    The client has to implement the interface of
+    :py:mod:`werkzeug.contrib.cache`, like
+    :py:class:`~werkzeug.contrib.cache.RedisCache` or
+    :py:class:`~werkzeug.contrib.cache.MemcachedCache`.  A
+    :py:class:`~werkzeug.contrib.cache.SimpleCache` can be used as a
+    local stand-in.
+
+    :param client: The cache client
+    :param ttl: The timeout in seconds passed on to the client
+    :param str prefix: A prefix prepended to every key
+    """
+    def __init__(self, client, ttl=60, prefix=""):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            client=self.client,
+            ttl=self.ttl,
+            prefix=self.prefix,
+        ))
+
+    def get(self, key, default=None):
+        value = self.client.get(self.prefix + key)
+        return default if value is None else value
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, value, timeout=self.ttl)
+
+    def delete(self, key):
+        self.client.delete(self.prefix + key)
@@ -1,10 +1,10 @@
 # -*- coding: utf-8 -*-
+from collections import namedtuple
 from datetime import datetime
 from logging import getLogger
 from subprocess import call
 
 import git
-from flask_babel import format_datetime
 from git.exc import (GitCommandError, InvalidGitRepositoryError,
                      NoSuchPathError, CacheError)
 
@@ -41,23 +41,42 @@ def init_repo(repo_dir, repo_url):
     logger.info("Initialized git repository %s in %s", repo_url, repo_dir)
 
 
-def update_repo(repo_dir):
-    repo = git.Repo.init(repo_dir)
+def update_repo(repo_dir, branch='master'):
+    """Fetch `branch` from `origin` and reset the repo to it
 
+    The remote is fetched once, and the working tree is only touched
+    if ``FETCH_HEAD`` differs from ``HEAD``.
+
+    :param repo_dir: path of repo
+    :type repo_dir: str
+    :param branch: the remote branch to follow
+    :type branch: str
+    :return: the paths changed by the update, relative to `repo_dir`.
+        Empty if the repo has been up to date or could not be updated.
+    :rtype: list of str
+    """
     try:
-        if repo.commit().hexsha != repo.remote().fetch()[0].commit.hexsha:
-            origin = repo.remote()
-            origin.fetch()
-            repo.git.reset('--hard', 'origin/master')
-            return True
-        else:
-            return False
-    except GitCommandError:
+        repo = git.Repo(repo_dir)
+        repo.git.fetch('origin', branch)
+    except (InvalidGitRepositoryError, NoSuchPathError, GitCommandError):
         logger.error("Git fetch failed", extra={'data': {'repo_dir': repo_dir}})
-    else:
-        logger.info("Fetched git repository", extra={'data': {
-            'repo_dir': repo_dir
-        }})
+        return []
+
+    head = repo.head.commit
+    fetched = repo.commit('FETCH_HEAD')
+    if head == fetched:
+        return []
+
+    changed_paths = sorted({path for diff in head.diff(fetched)
+                            for path in (diff.a_path, diff.b_path)
+                            if path is not None})
+    repo.git.reset('--hard', fetched.hexsha)
+    logger.info("Updated git repository", extra={'data': {
+        'repo_dir': repo_dir,
+        'commit': fetched.hexsha,
+        'changed_paths': changed_paths,
+    }})
+    return changed_paths
 
 
 def get_repo_active_branch(repo_dir):
@@ -70,7 +89,7 @@ def get_repo_active_branch(repo_dir):
     try:
         sipa_repo = git.Repo(repo_dir)
         return sipa_repo.active_branch.name
-    except GitCommandError:
+    except (InvalidGitRepositoryError, NoSuchPathError, GitCommandError):
         return "Unknown"
     except TypeError:  # detatched HEAD
         return "@{}".format(sipa_repo.head.commit.hexsha[:8])
@@ -83,7 +102,8 @@ def get_latest_commits(repo_dir, commit_count):
     :param commit_count: number of commits to return
     :type commit_count: int
     :return: commit information (hash, message, author, date) about
-    commit_count last commits
+    commit_count last commits.  The date is a :py:class:`datetime`,
+    so it can be formatted in the locale of the request.
     :rtype: list of dicts
     """
     try:
@@ -93,10 +113,28 @@ def get_latest_commits(repo_dir, commit_count):
             'hexsha': commit.hexsha,
             'message': commit.summary,
             'author': commit.author,
-            'date': format_datetime(datetime.fromtimestamp(
-                commit.committed_date)),
+            'date': datetime.fromtimestamp(commit.committed_date),
         } for commit in commits]
-    except (InvalidGitRepositoryError, CacheError, GitCommandError):
+    except (InvalidGitRepositoryError, NoSuchPathError, CacheError,
+            GitCommandError):
         logger.exception("Could not get latest commits", extra={'data': {
             'repo_dir': repo_dir}})
         return []
+
+
+VersionInfo = namedtuple('VersionInfo', ['active_branch', 'commits'])
+
+
+def get_version_info(repo_dir, commit_count):
+    """Collect the information shown on the version page
+
+    :param repo_dir: path of repo
+    :type repo_dir: str
+    :param commit_count: number of commits to return
+    :type commit_count: int
+    :rtype: VersionInfo
+    """
+    return VersionInfo(
+        active_branch=get_repo_active_branch(repo_dir),
+        commits=get_latest_commits(repo_dir, commit_count),
+    )
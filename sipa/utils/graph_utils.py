@@ -1,12 +1,16 @@
 # -*- coding: utf-8 -*-
+import json
+from hashlib import sha1
+
 import pygal
-from flask_babel import gettext
+from flask_babel import get_locale, gettext
 from pygal.colors import hsl_to_rgb
 from pygal.style import Style
 
 from sipa.units import (format_as_traffic, max_divisions,
                         reduce_by_base)
 from sipa.utils.babel_utils import get_weekday
+from sipa.utils.svg_charts import BarChart, LineChart
 
 
 def rgb_string(r, g, b):
@@ -43,6 +47,17 @@ def default_chart(chart_type, title, inline=True, **kwargs):
     )
 
 
+def native_chart(chart_type, title, inline=True, **kwargs):
+    """Create a chart of :py:mod:`sipa.utils.svg_charts` looking like
+    the pygal ``chart_type`` created by :py:func:`default_chart`.
+
+    The output never contains an xml declaration, so ``inline`` is
+    ignored.
+    """
+    chart_class = {pygal.Bar: BarChart, pygal.Line: LineChart}[chart_type]
+    return chart_class(title, style=traffic_style, height=350, **kwargs)
+
+
 def generate_traffic_chart(traffic_data, inline=True):
     """Create a graph object from the input traffic data with pygal.
      If inline is set, the chart is being passed the option to not add an xml
@@ -52,6 +67,15 @@ def generate_traffic_chart(traffic_data, inline=True):
     :param inline: Determines the option `disable_xml_declaration`
     :return: The graph object
     """
+    return build_traffic_chart(default_chart, traffic_data, inline)
+
+
+def native_traffic_chart(traffic_data, inline=True):
+    """Like :py:func:`generate_traffic_chart`, but without pygal"""
+    return build_traffic_chart(native_chart, traffic_data, inline)
+
+
+def build_traffic_chart(chart_factory, traffic_data, inline=True):
     # choose unit according to maximum of `throughput`
     divisions = max_divisions(max(day['throughput'] for day in traffic_data))
 
@@ -62,7 +86,7 @@ def generate_traffic_chart(traffic_data, inline=True):
                      }
                     for entry in traffic_data]
 
-    traffic_chart = default_chart(
+    traffic_chart = chart_factory(
         pygal.Bar,
         gettext("Traffic (MiB)"),
         inline,
@@ -94,11 +118,21 @@ def generate_credit_chart(traffic_data, inline=True, max_credit=(63 * 1024 ** 2)
     :param inline: Determines the option `disable_xml_declaration`
     :return: The graph object
     """
+    return build_credit_chart(default_chart, traffic_data, inline, max_credit)
+
+
+def native_credit_chart(traffic_data, inline=True, max_credit=(63 * 1024 ** 2)):
+    """Like :py:func:`generate_credit_chart`, but without pygal"""
+    return build_credit_chart(native_chart, traffic_data, inline, max_credit)
+
+
+def build_credit_chart(chart_factory, traffic_data, inline=True,
+                       max_credit=(63 * 1024 ** 2)):
     raw_max = max_credit
     divisions = max_divisions(raw_max)
     max = reduce_by_base(raw_max, divisions)
 
-    credit_chart = default_chart(
+    credit_chart = chart_factory(
         pygal.Line,
         gettext("Credit (GiB)"),
         inline,
@@ -119,8 +153,67 @@ def generate_credit_chart(traffic_data, inline=True, max_credit=(63 * 1024 ** 2)
     return credit_chart
 
 
-def provide_render_function(generator):
-    def renderer(data, **kwargs):
+#: The chart generators by renderer, see the ``CHART_RENDERER`` config
+CHART_GENERATORS = {
+    'native': {'traffic': native_traffic_chart,
+               'credit': native_credit_chart},
+    'pygal': {'traffic': generate_traffic_chart,
+              'credit': generate_credit_chart},
+}
+
+
+def chart_cache_key(generator, data, **kwargs):
+    """Return a digest identifying a rendered chart
+
+    The key covers everything the output depends on: the generator,
+    the data, the keyword arguments (e.g. ``max_credit``) and the
+    current locale.
+
+    :param generator: The chart generating function
+    :param data: The traffic data passed to ``generator``
+    :return: The hex digest
+    :rtype: str
+    """
+    payload = json.dumps([generator.__name__, str(get_locale()), data, kwargs],
+                         sort_keys=True, default=str)
+    return sha1(payload.encode('utf-8')).hexdigest()
+
+
+def render_chart(generator, data, cache=None, key=None, **kwargs):
+    """Render the chart of ``generator`` for ``data``
+
+    :param generator: The chart generating function
+    :param data: The traffic data passed to ``generator``
+    :param cache: An optional cache like
+        :py:class:`~sipa.utils.cache.MemoryCache` to store the
+        rendered chart in
+    :param key: The cache key if already computed, else
+        :py:func:`chart_cache_key` is used
+    :return: The rendered SVG
+    :rtype: str
+    """
+    if cache is None:
         return generator(data, **kwargs).render()
 
+    if key is None:
+        key = chart_cache_key(generator, data, **kwargs)
+    rendered = cache.get(key)
+    if rendered is None:
+        rendered = generator(data, **kwargs).render()
+        cache.set(key, rendered)
+    return rendered
+
+
+def provide_render_function(generator, cache=None):
+    """Return a function rendering the charts of ``generator``
+
+    :param generator: The chart generating function
+    :param cache: An optional cache like
+        :py:class:`~sipa.utils.cache.MemoryCache` to store the
+        rendered charts in.  The key is built by
+        :py:func:`chart_cache_key`.
+    """
+    def renderer(data, **kwargs):
+        return render_chart(generator, data, cache=cache, **kwargs)
+
     return renderer
@@ -1,42 +1,62 @@
+import logging
 import re
 
-from flask import request
+from flask import has_request_context, request
 from markdown.extensions import Extension
 from markdown.postprocessors import Postprocessor
 
+logger = logging.getLogger(__name__)
 
-def absolute_path_replacer(match):
-    """Correct the url in a regex match prepending the absolute path"""
-    assert len(match.groups()) == 2
+#: Matches ``href`` and ``src`` attributes holding an absolute path
+ABSOLUTE_LINK_PATTERN = re.compile('(href|src)="(/[^"]*)"', re.IGNORECASE)
 
-    prefix = request.script_root
+
+def rewrite_links(html, prefix):
+    """Prepend ``prefix`` to the absolute paths linked in ``html``
+
+    :param str html: The html to rewrite
+    :param str prefix: The prefix, usually ``request.script_root``
+    :return: The rewritten html
+    :rtype: str
+    """
     if prefix.endswith("/"):
         prefix = prefix[:-1]
+    if not prefix:
+        return html
+
+    def prefix_link(match):
+        return "{key}=\"{path}\"".format(key=match.group(1),
+                                         path=prefix + match.group(2))
 
-    return "{key}=\"{path}\"".format(
-        key=match.group(1),
-        path=prefix + match.group(2)
-    )
+    return ABSOLUTE_LINK_PATTERN.sub(prefix_link, html)
 
 
 class LinkPostprocessor(Postprocessor):
+    """Rewrite the links for the script root of the current request
+
+    Note that the flatpages don't use this, as their html would then
+    depend on the request it has first been rendered in.  See
+    :py:attr:`sipa.flatpages.Article.html` instead.
+    """
     @staticmethod
     def run(text):
-        return re.sub(
-            '(href|src)="(/[^"]*)"',
-            absolute_path_replacer,
-            text,
-            flags=re.IGNORECASE,
-        )
+        if not has_request_context():
+            return text
+        return rewrite_links(text, request.script_root)
 
 
 class AbsoluteLinkExtension(Extension):
-    """ Add the absolute link patch to Markdown. """
+    """Formerly added the :py:class:`LinkPostprocessor` to Markdown.
+
+    The flatpages rewrite their links themselves, so running the
+    postprocessor as well would prefix the links twice.  The extension
+    only warns about being configured and adds nothing.
+    """
 
     @staticmethod
     def extendMarkdown(md, md_globals):
-        """ Add an instance of TableProcessor to BlockParser. """
-        md.postprocessors['link_patch'] = LinkPostprocessor(md)
+        logger.warning("'sipa.utils.link_patch' is obsolete and ignored, "
+                       "remove it from FLATPAGES_MARKDOWN_EXTENSIONS")
 
 
 def makeExtension(*args, **kwargs):
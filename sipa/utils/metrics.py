@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+Collecting runtime metrics
+"""
+
+from bisect import bisect_left
+from contextlib import contextmanager
+from itertools import accumulate
+from threading import Lock
+from time import monotonic
+
+from sipa.utils import argstr
+
+
+class LatencyHistogram:
+    """Count durations in buckets of upper bounds
+
+    A duration is counted in the first bucket whose bound it does not
+    exceed, or in an overflow bucket.  As with prometheus, the counts
+    in :py:attr:`metrics` are cumulative.
+
+    **Usage:**
+
+    >>> histogram = LatencyHistogram(buckets=(0.1, 1))
+    >>> with histogram.time():
+    ...     do_something()
+    >>> histogram.metrics
+    {'count': 1, 'sum': 0.02, 'buckets': {'0.1': 1, '1': 1, '+Inf': 1}}
+
+    :param buckets: The upper bounds of the buckets in seconds
+    """
+    DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        #: One count per bucket, the overflow bucket last
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = Lock()
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            buckets=self.buckets,
+            count=self.count,
+        ))
+
+    def observe(self, seconds):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+
+    @contextmanager
+    def time(self):
+        """Observe the duration of the ``with`` block, even if it
+        raised an exception"""
+        start = monotonic()
+        try:
+            yield
+        finally:
+            self.observe(monotonic() - start)
+
+    @property
+    def metrics(self):
+        """The count, the sum and the cumulative bucket counts as a dict"""
+        with self._lock:
+            counts = list(self._counts)
+            metrics = {'count': self.count, 'sum': self.sum}
+
+        labels = ['{:g}'.format(bound) for bound in self.buckets] + ['+Inf']
+        metrics['buckets'] = dict(zip(labels, accumulate(counts)))
+        return metrics
@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+A small SVG renderer for the traffic charts
+
+The traffic and credit charts always have the same shape: one value
+per day of the last week.  Instead of pygal's generic machinery, the
+geometry is computed here and written out by the
+``charts/chart.svg`` template.
+
+The objects provide a ``render()`` method like pygal charts do, so
+they can be used by :py:func:`~sipa.utils.graph_utils.render_chart`.
+"""
+
+from abc import ABCMeta, abstractmethod
+from math import ceil, floor, log10
+
+from flask import current_app
+
+from sipa.utils import argstr
+
+#: The template writing out the computed geometry
+CHART_TEMPLATE = 'charts/chart.svg'
+
+#: The multiples of a power of ten allowed as a step between two guides
+NICE_STEPS = (1, 2, 2.5, 5, 10)
+
+
+def guide_values(maximum, count=5):
+    """Return evenly spaced values from 0 to at least ``maximum``.
+
+    The step is a “nice” number (see :py:obj:`NICE_STEPS`), so there
+    are at most ``count`` steps.
+
+    :param maximum: The largest value to be covered
+    :param int count: The maximal number of steps
+    :rtype: list of float
+    """
+    if maximum <= 0:
+        return [0, 1]
+
+    raw_step = maximum / count
+    magnitude = 10 ** floor(log10(raw_step))
+    step = next(multiple * magnitude for multiple in NICE_STEPS
+                if multiple * magnitude >= raw_step)
+    return [i * step for i in range(int(ceil(maximum / step - 1e-9)) + 1)]
+
+
+def format_guide(value):
+    """Format a guide label without superfluous decimals"""
+    return "{:g}".format(round(value, 2))
+
+
+def coordinate(value):
+    """Format a coordinate, stripping superfluous decimals"""
+    return "{:.2f}".format(value).rstrip('0').rstrip('.')
+
+
+class Series:
+    """One series of values belonging to a label
+
+    :param str title: The label shown in the legend
+    :param list values: One value per x label
+    :param str color: The color of the series
+    :param dict stroke_style: Like pygal's ``stroke_style``, only
+        ``dasharray`` and ``width`` are supported
+    :param bool fill: Whether to fill the area below a line
+    :param bool show_dots: Whether to mark the values of a line
+    """
+    def __init__(self, title, values, color, stroke_style=None, fill=True,
+                 show_dots=True):
+        self.title = title
+        self.values = values
+        self.color = color
+        self.stroke_style = stroke_style or {}
+        self.fill = fill
+        self.show_dots = show_dots
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            title=self.title,
+            values=self.values,
+            color=self.color,
+        ))
+
+    @property
+    def dasharray(self):
+        return self.stroke_style.get('dasharray')
+
+    @property
+    def stroke_width(self):
+        return self.stroke_style.get('width', 1)
+
+
+class SvgChart(metaclass=ABCMeta):
+    """The common layout of bar and line charts
+
+    The legend is placed left to the plot, the title above it and the
+    x labels below it, as pygal does by default.
+
+    :param str title: The title of the chart
+    :param style: A :py:class:`pygal.style.Style` to take the colors,
+        opacities and the font from
+    :param value_formatter: A function formatting the values in the
+        tooltips
+    :param tuple range: The range of the y axis if not to be inferred
+        from the values
+    """
+    #: The kind of chart, used as a css class of the series
+    kind = None
+
+    width = 800
+    height = 350
+    margin = 10
+    legend_width = 120
+    title_height = 36
+    x_label_height = 30
+    y_label_width = 40
+
+    def __init__(self, title, style, value_formatter=str, range=None,
+                 height=None):
+        self.title = title
+        self.style = style
+        self.value_formatter = value_formatter
+        self.range = range
+        if height is not None:
+            self.height = height
+        self._x_labels = []
+        self.series = []
+
+    def __repr__(self):
+        return "{}.{}({})".format(__name__, type(self).__name__, argstr(
+            title=self.title,
+            series=self.series,
+        ))
+
+    @property
+    def x_labels(self):
+        return self._x_labels
+
+    @x_labels.setter
+    def x_labels(self, labels):
+        self._x_labels = list(labels)
+
+    def add(self, title, values, **kwargs):
+        """Add a series, taking the next color of the style"""
+        colors = self.style.colors
+        color = colors[len(self.series) % len(colors)]
+        self.series.append(Series(title, list(values), color, **kwargs))
+
+    @property
+    def plot_box(self):
+        """The ``(left, top, right, bottom)`` edges of the plot"""
+        left = self.margin + self.legend_width + self.y_label_width
+        return (left, self.title_height, self.width - self.margin,
+                self.height - self.x_label_height)
+
+    def guides(self):
+        if self.range is not None:
+            return guide_values(self.range[1])
+        return guide_values(max((max(s.values, default=0)
+                                 for s in self.series), default=0))
+
+    def scale(self, guides):
+        """Return a function mapping a value onto its y coordinate"""
+        _, top, _, bottom = self.plot_box
+        maximum = guides[-1]
+
+        def y(value):
+            return bottom - (bottom - top) * min(value, maximum) / maximum
+
+        return y
+
+    def slots(self):
+        """Return the left edge and width of the slot of each x label"""
+        left, _, right, _ = self.plot_box
+        width = (right - left) / max(len(self.x_labels), 1)
+        return [(left + i * width, width) for i in range(len(self.x_labels))]
+
+    def tooltip(self, series, label, value):
+        return "{}: {} – {}".format(series.title, label,
+                                    self.value_formatter(value))
+
+    @abstractmethod
+    def layout_series(self, slots, y):
+        """**[Abstract]** Return the geometry of the series for the
+        template"""
+        pass
+
+    def context(self):
+        guides = self.guides()
+        y = self.scale(guides)
+        slots = self.slots()
+        left, top, right, bottom = self.plot_box
+
+        return {
+            'chart': self,
+            'kind': self.kind,
+            'style': self.style,
+            'coordinate': coordinate,
+            'plot': {'left': left, 'top': top, 'right': right,
+                     'bottom': bottom},
+            'guides': [(y(value), format_guide(value)) for value in guides],
+            'x_labels': [(x + width / 2, label) for (x, width), label
+                         in zip(slots, self.x_labels)],
+            'series': self.layout_series(slots, y),
+        }
+
+    def render(self):
+        """Render the chart as an inline SVG element
+
+        :rtype: str
+        """
+        template = current_app.jinja_env.get_template(CHART_TEMPLATE)
+        return template.render(**self.context())
+
+
+class BarChart(SvgChart):
+    kind = 'bar'
+    #: The fraction of a slot covered by the bars
+    bar_ratio = 0.8
+
+    def layout_series(self, slots, y):
+        count = len(self.series)
+        layouts = []
+        for index, series in enumerate(self.series):
+            bars = []
+            for (x, width), label, value in zip(slots, self.x_labels,
+                                                series.values):
+                bar_width = width * self.bar_ratio / count
+                bar_x = x + width * (1 - self.bar_ratio) / 2 + index * bar_width
+                bars.append({
+                    'x': bar_x,
+                    'y': y(value),
+                    'width': bar_width,
+                    'height': y(0) - y(value),
+                    'tooltip': self.tooltip(series, label, value),
+                })
+            layouts.append({'series': series, 'bars': bars})
+        return layouts
+
+
+class LineChart(SvgChart):
+    kind = 'line'
+    dot_radius = 3
+
+    def layout_series(self, slots, y):
+        layouts = []
+        for series in self.series:
+            points = [(x + width / 2, y(value)) for (x, width), value
+                      in zip(slots, series.values)]
+            line = " ".join("{},{}".format(coordinate(px), coordinate(py))
+                            for px, py in points)
+            area = None
+            if series.fill and points:
+                area = "{},{} {} {},{}".format(
+                    coordinate(points[0][0]), coordinate(y(0)), line,
+                    coordinate(points[-1][0]), coordinate(y(0)),
+                )
+            dots = []
+            if series.show_dots:
+                dots = [{'x': px, 'y': py,
+                         'tooltip': self.tooltip(series, label, value)}
+                        for (px, py), label, value
+                        in zip(points, self.x_labels, series.values)]
+            layouts.append({'series': series, 'line': line, 'area': area,
+                            'dots': dots})
+        return layouts
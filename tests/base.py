@@ -3,9 +3,11 @@ from contextlib import contextmanager
 
 from flask import Flask
 from flask_testing import TestCase
+from sqlalchemy import event
 
 from sipa import create_app
 from sipa.defaults import WARNINGS_ONLY_CONFIG
+from sipa.model.sqlalchemy import db
 
 
 class AppInitialized(TestCase):
@@ -72,6 +74,32 @@ class AppInitialized(TestCase):
         yield
         setattr(self, attr_name, old_value)
 
+    @contextmanager
+    def record_queries(self, bind=None):
+        """Record the statements sent to a database.
+
+        Usage:
+
+        >>> with self.record_queries('traffic') as statements:
+        ...     user.traffic_history
+        >>> len(statements)
+        1
+
+        :param str bind: The bind key of the database
+        :return: The list the statements are appended to
+        """
+        engine = db.get_engine(self.app, bind=bind)
+        statements = []
+
+        def record(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', record)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', record)
+
     def temp_short_log(self):
         return self.temp_set_attribute('longMessage', False)
 
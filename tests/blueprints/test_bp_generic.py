@@ -1,9 +1,13 @@
+from datetime import datetime
 from functools import partial
+from unittest.mock import PropertyMock, patch
 
 from flask import abort, url_for
+from werkzeug.contrib.cache import SimpleCache
 from tests.base import SampleFrontendTestBase, FormTemplateTestMixin
 
 from sipa.model import backends
+from sipa.utils.git_utils import VersionInfo
 
 
 class TestErrorhandlersCase(SampleFrontendTestBase):
@@ -51,6 +55,220 @@ class GenericEndpointsReachableTestCase(SampleFrontendTestBase):
         self.assertTemplateUsed('version.html')
 
 
+class VersionTestCase(SampleFrontendTestBase):
+    def setUp(self):
+        super().setUp()
+        self.app.extensions['version_info'] = VersionInfo(
+            active_branch='master',
+            commits=[{'hexsha': 'a' * 40, 'message': "Fix things",
+                      'author': "Foo", 'date': datetime(2016, 3, 1, 12)}],
+        )
+
+    def test_repo_not_read_per_request(self):
+        with patch('git.Repo') as repo:
+            for _ in range(2):
+                self.assert200(self.client.get(url_for('generic.version')))
+
+        self.assertFalse(repo.called)
+
+    def test_date_formatted_per_locale(self):
+        for locale, date in [('de', "01.03.2016"), ('en', "Mar 1, 2016")]:
+            with self.subTest(locale=locale):
+                rv = self.client.get(url_for('generic.version', locale=locale))
+                self.assertIn(date, rv.data.decode('utf-8'))
+
+    def test_etag_validated(self):
+        rv = self.client.get(url_for('generic.version'))
+        etag, _ = rv.get_etag()
+        self.assertIsNotNone(etag)
+
+        rv = self.client.get(url_for('generic.version'),
+                             headers={'If-None-Match': '"{}"'.format(etag)})
+        self.assertStatus(rv, 304)
+
+
+class UserLookupCachedTestCase(SampleFrontendTestBase):
+    """Test that the users are looked up only once per request"""
+    def setUp(self):
+        super().setUp()
+        self.backends = self.app.extensions['backends']
+        self.backends.user_cache.reset_stats()
+        self.user_class = self.backends.get_datasource('sample').user_class
+
+    def get_usertraffic(self):
+        return self.client.get(url_for('generic.usertraffic'),
+                               environ_base={'REMOTE_ADDR': '127.0.0.1'})
+
+    def test_user_from_ip_called_once_per_request(self):
+        with patch.object(self.user_class, 'from_ip',
+                          wraps=self.user_class.from_ip) as from_ip:
+            self.assert200(self.get_usertraffic())
+
+        # once in the view, once for the gauge in `base.html`
+        self.assertEqual(from_ip.call_count, 1)
+        self.assertEqual(self.backends.user_cache.misses, 1)
+        self.assertGreaterEqual(self.backends.user_cache.hits, 1)
+
+    def test_cache_dropped_after_request(self):
+        with patch.object(self.user_class, 'from_ip',
+                          wraps=self.user_class.from_ip) as from_ip:
+            self.get_usertraffic()
+            self.get_usertraffic()
+
+        self.assertEqual(from_ip.call_count, 2)
+
+    def test_user_from_uid_called_once(self):
+        with patch.object(self.user_class, 'get',
+                          wraps=self.user_class.get) as get, \
+                self.app.test_request_context():
+            users = [self.backends.user_from_uid(self.user_class.datasource,
+                                                 'test')
+                     for _ in range(3)]
+
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(self.backends.user_cache.misses, 1)
+        self.assertEqual(self.backends.user_cache.hits, 2)
+        self.assertTrue(all(user is users[0] for user in users))
+
+
+class TrafficChartTestCase(SampleFrontendTestBase):
+    def get_chart(self, chart, **kwargs):
+        return self.client.get(
+            url_for('generic.traffic_chart', chart=chart, source='ip'),
+            environ_base={'REMOTE_ADDR': '127.0.0.1'},
+            **kwargs
+        )
+
+    def test_charts_rendered_as_svg(self):
+        for chart in ['traffic', 'credit']:
+            with self.subTest(chart=chart):
+                rv = self.get_chart(chart)
+                self.assert200(rv)
+                self.assertEqual(rv.mimetype, 'image/svg+xml')
+                self.assertIn(b'<svg', rv.data)
+                self.assertIsNone(rv.last_modified)
+                self.assertTrue(rv.cache_control.private)
+
+    def test_unchanged_chart_not_modified(self):
+        user_class = self.app.extensions['backends'].get_datasource('sample') \
+            .user_class
+        history = [{'day': day, 'input': 1024**2, 'output': 1024,
+                    'throughput': 1024**2 + 1024, 'credit': 42 * 1024**2}
+                   for day in range(7)]
+
+        for chart in ['traffic', 'credit']:
+            with self.subTest(chart=chart), \
+                    patch.object(user_class, 'traffic_history',
+                                 new_callable=PropertyMock,
+                                 return_value=history):
+                etag, _ = self.get_chart(chart).get_etag()
+                rv = self.get_chart(chart, headers={
+                    'If-None-Match': '"{}"'.format(etag),
+                })
+                self.assertStatus(rv, 304)
+                self.assertEqual(rv.data, b'')
+
+    def test_charts_differ(self):
+        etags = {self.get_chart(chart).get_etag()
+                 for chart in ['traffic', 'credit']}
+        self.assertEqual(len(etags), 2)
+
+    def test_chart_denied_without_user(self):
+        rv = self.client.get(url_for('generic.traffic_chart', chart='traffic'))
+        self.assertStatus(rv, 401)
+
+    def test_chart_denied_without_connection(self):
+        self.client.post(url_for('generic.login'),
+                         data={'dormitory': 'localhost',
+                               'username': 'test',
+                               'password': 'test'})
+        user_class = self.app.extensions['backends'].get_datasource('sample') \
+            .user_class
+
+        with patch.object(user_class, 'has_connection', False), \
+                patch.object(user_class, 'traffic',
+                             new_callable=PropertyMock) as traffic:
+            rv = self.client.get(url_for('generic.traffic_chart',
+                                         chart='traffic'))
+
+        self.assertStatus(rv, 403)
+        traffic.assert_not_called()
+
+    def test_usertraffic_loads_charts_lazily(self):
+        rv = self.client.get(url_for('generic.usertraffic'),
+                             environ_base={'REMOTE_ADDR': '127.0.0.1'})
+        self.assert200(rv)
+        self.assertNotIn(b'<svg', rv.data)
+        for chart in ['traffic', 'credit']:
+            url = url_for('generic.traffic_chart', chart=chart, source='ip')
+            self.assertIn('data-chart-src="{}"'.format(url).encode(), rv.data)
+
+
+class UserSnapshotCacheTestCase(SampleFrontendTestBase):
+    """Test that users are restored from snapshots between requests"""
+    def setUp(self):
+        super().setUp()
+        self.backends = self.app.extensions['backends']
+        self.snapshots = self.backends.user_snapshots
+        self.snapshots.reset_stats()
+        self.datasource = self.backends.get_datasource('sample')
+        self.user_class = self.datasource.user_class
+
+    def load_user(self, uid='test'):
+        with self.app.test_request_context():
+            return self.backends.user_from_uid(self.datasource, uid)
+
+    def assert_get_called_once(self):
+        with patch.object(self.user_class, 'get',
+                          wraps=self.user_class.get) as get:
+            users = [self.load_user() for _ in range(3)]
+
+        self.assertEqual(get.call_count, 1)
+        self.assertEqual(self.snapshots.misses, 1)
+        self.assertEqual(self.snapshots.hits, 2)
+        return users
+
+    def test_user_restored_from_snapshot(self):
+        first, *restored = self.assert_get_called_once()
+
+        for user in restored:
+            self.assertIsNot(user, first)
+            self.assertIsInstance(user, self.user_class)
+            self.assertEqual(user, first)
+            self.assertEqual(user.realname, first.realname)
+            self.assertEqual(user.mail, first.mail)
+
+    def test_shared_backend(self):
+        self.app.config['USER_CACHE_CLIENT'] = SimpleCache()
+        self.snapshots.init_app(self.app)
+
+        self.assert_get_called_once()
+
+    def test_caching_disabled_without_ttl(self):
+        self.app.config['USER_CACHE_TTL'] = None
+        self.snapshots.init_app(self.app)
+
+        with patch.object(self.user_class, 'get',
+                          wraps=self.user_class.get) as get:
+            self.load_user()
+            self.load_user()
+
+        self.assertEqual(get.call_count, 2)
+
+    def test_anonymous_user_not_cached(self):
+        self.load_user('nonexistent')
+        self.load_user('nonexistent')
+        self.assertEqual(self.snapshots.misses, 2)
+
+    def test_invalidate_user(self):
+        user = self.load_user()
+        self.backends.invalidate_user(user)
+        self.load_user()
+
+        self.assertEqual(self.snapshots.misses, 2)
+        self.assertEqual(self.snapshots.hits, 0)
+
+
 class LoginTestCase(FormTemplateTestMixin, SampleFrontendTestBase):
     def setUp(self):
         super().setUp()
@@ -60,3 +60,13 @@ class GitHookExistent(GitHookTestBase):
         with patch('sipa.blueprints.hooks.update_repo') as mock:
             self.assert_hook_status(204, token=self.token)
             self.assertTrue(mock.called)
+
+    def test_content_reloaded_on_update(self):
+        reloader = self.app.extensions['content_reloader']
+        for changed_paths in [['news/foo.de.md'], []]:
+            with self.subTest(changed_paths=changed_paths), \
+                    patch('sipa.blueprints.hooks.update_repo',
+                          return_value=changed_paths), \
+                    patch.object(reloader, 'reload') as reload:
+                self.assert_hook_status(204, token=self.token)
+                self.assertEqual(reload.called, bool(changed_paths))
@@ -84,6 +84,21 @@ class UsersuiteReachableTestCase(SampleFrontendTestBase):
                                  'href="[^"]*{}[^"]*"'.format(url))
 
 
+class TrafficLoadedOnceTestCase(SampleFrontendTestBase):
+    def test_traffic_loaded_once_per_request(self):
+        user_class = self.app.extensions['backends'] \
+            .get_datasource('sample').user_class
+
+        with patch.object(user_class, 'load_traffic_snapshot', autospec=True,
+                          side_effect=user_class.load_traffic_snapshot) as load:
+            self.assert200(self.client.get(url_for('usersuite.index')))
+            # gauge, traffic table and both charts
+            self.assertEqual(load.call_count, 1)
+
+            self.client.get(url_for('usersuite.index'))
+            self.assertEqual(load.call_count, 2)
+
+
 class FinanceLogsTestCase(SampleFrontendTestBase):
     def setUp(self):
         super().setUp()
@@ -96,3 +111,48 @@ class FinanceLogsTestCase(SampleFrontendTestBase):
 
     def test_finance_logs_available(self):
         self.assertTemplateUsed('usersuite/finance_logs.html')
+
+    def test_single_page(self):
+        self.assertEqual(len(self.get_context_variable('logs')), 3)
+        self.assertIsNone(self.get_context_variable('next_key'))
+
+    def test_invalid_key_rejected(self):
+        self.assert400(self.client.get(url_for('usersuite.finance_logs',
+                                               before='foo')))
+
+
+class UserSnapshotInvalidatedTestCase(SampleFrontendTestBase):
+    def setUp(self):
+        super().setUp()
+        self.login()
+        backends = self.app.extensions['backends']
+        self.snapshots = backends.user_snapshots
+        self.key = 'sample:test'
+        # populate the cache
+        self.client.get(url_for('usersuite.index'))
+        self.assertIsNotNone(self.snapshots.backend.get(self.key))
+
+    def test_change_mac_invalidates(self):
+        self.client.post(url_for('usersuite.change_mac'),
+                         data={'password': 'test',
+                               'mac': 'aa:bb:cc:dd:ee:00'})
+        self.assertIsNone(self.snapshots.backend.get(self.key))
+
+    def test_change_mail_invalidates(self):
+        self.client.post(url_for('usersuite.change_mail'),
+                         data={'password': 'test',
+                               'email': 'foo@bar.baz'})
+        self.assertIsNone(self.snapshots.backend.get(self.key))
+
+    def test_change_password_invalidates(self):
+        self.client.post(url_for('usersuite.change_password'),
+                         data={'old': 'test',
+                               'new': 'Ahs8shi4-ooph',
+                               'confirm': 'Ahs8shi4-ooph'})
+        self.assertIsNone(self.snapshots.backend.get(self.key))
+
+    def test_failed_change_keeps_snapshot(self):
+        self.client.post(url_for('usersuite.change_mac'),
+                         data={'password': 'wrong',
+                               'mac': 'aa:bb:cc:dd:ee:00'})
+        self.assertIsNotNone(self.snapshots.backend.get(self.key))
@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 
 
 from sipa.model.hss.schema import Account, AccountProperty, Access, IP, Mac, TrafficLog, \
@@ -86,6 +86,22 @@ class HSSOneTrafficAccountFixture(HSSOneAccountFixture):
         ])
 
 
+class HSSOneLongTrafficAccountFixture(HSSOneAccountFixture):
+    """An account having daily traffic logs for the last five years"""
+    @property
+    def fixtures_pg(self):
+        today = date.today()
+        return OrderedDict([
+            *super().fixtures_pg.items(),
+            (TrafficLog, [
+                TrafficLog(id=days + 1, account='sipatinator',
+                           date=today - timedelta(days),
+                           bytes_in=days * 1024, bytes_out=1024)
+                for days in range(5 * 365)
+            ]),
+        ])
+
+
 class HSSOneTrafficAccountDaysMissingFixture(HSSOneTrafficAccountFixture):
     @property
     def fixtures_pg(self):
@@ -78,6 +78,20 @@ class HssUsersuiteTestCase(HssFrontendTestBase):
         rv_usersuite = self.client.get(url_for('usersuite.index'))
         self.assert200(rv_usersuite)
 
+    def test_usersuite_account_loaded_once(self):
+        with self.record_queries('hss') as statements:
+            self.assert200(self.client.get(url_for('usersuite.index')))
+
+        tables = [re.search(r'\bFROM (\w+)', statement).group(1)
+                  for statement in statements]
+        self.assertEqual(tables.count('account'), 1)
+        for table in ['ip', 'mac']:
+            with self.subTest(table=table):
+                self.assertLessEqual(tables.count(table), 1)
+        for table in ['access', 'account_property', 'traffic_quota']:
+            with self.subTest(table=table):
+                self.assertNotIn(table, tables)
+
 
 class HssPasswordChangeTestCase(HssFrontendTestBase):
     def setUp(self):
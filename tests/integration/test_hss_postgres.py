@@ -8,7 +8,8 @@ from flask_login import AnonymousUserMixin
 
 from .hss_fixtures import HSSOneAccountFixture, HSSOneTrafficAccountFixture, \
     HSSOneTrafficAccountDaysMissingFixture, HSSAccountsWithPropertiesFixture, \
-    HSSOneFinanceAccountFixture, OneCreditAccountFixture
+    HSSOneFinanceAccountFixture, OneCreditAccountFixture, \
+    HSSOneLongTrafficAccountFixture
 from tests.base import HssFrontendTestBase
 from sipa.model.sqlalchemy import db
 from sipa.model.hss.schema import Account, IP, Mac, TrafficLog, AccountStatementLog, \
@@ -94,6 +95,25 @@ class PgUserDataTestCase(OneAccountTestBase):
         expected_mail = "{}@wh12.tu-dresden.de".format(acc.account)
         self.assertEqual(user.mail, expected_mail)
 
+    def test_account_loaded_once(self):
+        with self.record_queries('hss') as statements:
+            for _ in range(2):
+                self.user.realname
+                self.user.ips
+                self.user.mac
+                self.user.address
+                self.user.has_connection
+                self.user.max_credit
+
+        # the account with its scalar relations, the ips and the macs
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(sum(" JOIN " in statement
+                             for statement in statements), 1)
+
+    def test_account_not_in_snapshot(self):
+        self.user.realname
+        self.assertNotIn('_cached_account', self.user.__getstate__())
+
     def test_uninitialized_max_credit_throws_warning(self):
         logger = logging.getLogger('sipa.model.hss.user')
         with self.assertLogs(logger, level='WARNING') as cm:
@@ -201,6 +221,14 @@ class UserTrafficLogTestCaseMixin:
                 else:
                     self.assertEqual(credit_difference, 3 * 1024**2 - entry['throughput'])
 
+    def test_traffic_snapshot_consistent(self):
+        with self.app.test_request_context():
+            snapshot = self.user.traffic
+            self.assertIs(self.user.traffic, snapshot)
+
+        self.assertEqual(snapshot.credit, self.user.credit)
+        self.assertEqual(snapshot.history, self.history)
+
 
 class UserTrafficLogTestCase(
         HSSOneTrafficAccountFixture,
@@ -218,6 +246,25 @@ class UserMissingTrafficLogTestCase(
     pass
 
 
+class UserLongTrafficLogTestCase(HSSOneLongTrafficAccountFixture,
+                                 OneAccountTestBase):
+    def test_last_week_passed(self):
+        history = self.user.traffic_history
+
+        self.assertEqual([entry['input'] for entry in history],
+                         [days for days in range(6, -1, -1)])
+
+    def test_only_last_week_fetched(self):
+        with self.record_queries('hss') as statements:
+            logs = self.user._traffic_logs_since(
+                datetime.today().date() - timedelta(6)
+            )
+
+        self.assertEqual(len(logs), 7)
+        self.assertEqual(len(statements), 1)
+        self.assertIn("traffic_log.date >=", statements[0])
+
+
 class UsersActiveTestCase(
         HSSAccountsWithPropertiesFixture,
         HssPgTestBase,
@@ -290,3 +337,43 @@ class UserFinanceLogTestCase(HSSOneFinanceAccountFixture, OneAccountTestBase):
         for log in self.user.finance_logs:
             with self.subTest(log=log):
                 self.assertEqual(len(log), 2)
+
+    def test_page_chronological_with_balance(self):
+        page = self.user.finance_log_page()
+
+        self.assertEqual([(entry.datum, entry.value)
+                          for entry in page.entries],
+                         self.user.finance_logs)
+        self.assertEqual([entry.balance for entry in page.entries],
+                         [21, 17.5, 14])
+        self.assertIsNone(page.next_key)
+
+    def test_pages_fetched_by_key(self):
+        entries = []
+        key = None
+        with self.record_queries('hss') as statements:
+            for _ in range(self.expected_length):
+                page = self.user.finance_log_page(before=key, limit=1)
+                entries = page.entries + entries
+                key = page.next_key
+
+        self.assertIsNone(key)
+        self.assertEqual(len(statements), self.expected_length)
+        self.assertEqual(entries, self.user.finance_log_page().entries)
+
+    def test_older_pages_not_summed_up(self):
+        key = self.user.finance_log_page(limit=1).next_key
+        with self.record_queries('hss') as statements:
+            self.user.finance_log_page(before=key, limit=1)
+
+        self.assertEqual(len(statements), 1)
+        self.assertNotIn("sum(", statements[0].lower())
+
+    def test_invalid_key(self):
+        for key in ['foo', '2016-04-02,statement,1',
+                    '2016-04-02T00:00:00.0,statement,1',
+                    '2016-04-02T00:00:00.0,x,1,0',
+                    '2016-04-02T00:00:00.0,statement,1,foo',
+                    '2016-04-02T00:00:00.0,statement,1,NaN']:
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                self.user.finance_log_page(before=key)
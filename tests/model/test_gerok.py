@@ -1,16 +1,21 @@
 import json
 import logging
 from functools import partial
+from http.server import BaseHTTPRequestHandler, HTTPServer
 from itertools import chain, product
+from socketserver import ThreadingMixIn
+from threading import Thread
+from time import sleep
 import unittest
 from unittest.mock import MagicMock, patch
 from urllib.parse import parse_qs, urlparse
 
+import requests
 from flask_login import AnonymousUserMixin
 from requests import Response
 
-from sipa.model.gerok.user import (User, do_api_call, date_from_delta,
-                                   date_str_from_delta)
+from sipa.model.gerok.user import (ApiClient, User, do_api_call,
+                                   date_from_delta, date_str_from_delta)
 from sipa.utils.exceptions import PasswordInvalid, UserNotFound
 from tests.base import GerokFrontendTestBase
 
@@ -39,14 +44,14 @@ class TestGerokApiCall(GerokFrontendTestBase):
     def set_token(self, token):
         self.app.extensions['gerok_api']['token'] = token
 
-    @patch('requests.get', get)
+    @patch('requests.Session.get', get)
     def test_empty_request(self):
         self.assertEqual(do_api_call(""), "")
         assert self.get.called
 
     KNOWN_STATUS_CODES = {200, 400, 403, 404}
 
-    @patch('requests.get', get)
+    @patch('requests.Session.get', get)
     def test_unknown_status_code_logs(self):
         unknown_codes = set(range(200, 500, 10)) - self.KNOWN_STATUS_CODES
         logger = logging.getLogger('sipa.model.gerok.user')
@@ -62,14 +67,14 @@ class TestGerokApiCall(GerokFrontendTestBase):
             self.assertEqual(len(cm.output), 1)
             self.assertIn('HTTP status', cm.output.pop())
 
-    @patch('requests.get', get)
+    @patch('requests.Session.get', get)
     def test_correct_url_called(self):
         do_api_call("")
 
         # assert that the call only got the positional args `(self.url,)`
         self.assertEqual(self.get.call_args[0], (self.url,))
 
-    @patch('requests.get', get)
+    @patch('requests.Session.get', get)
     def test_json_parsed(self):
         sample_dicts = [
             {},
@@ -80,15 +85,15 @@ class TestGerokApiCall(GerokFrontendTestBase):
             self.get()._content = json.dumps(d).encode()
             self.assertEqual(do_api_call(""), d)
 
-    @patch('requests.get', get)
-    @patch('requests.post', post)
+    @patch('requests.Session.get', get)
+    @patch('requests.Session.post', post)
     def test_post_called(self):
         do_api_call("", method='post', postdata=None)
         self.get.assert_not_called()
         self.assertEqual(self.post.called, True)
 
-    @patch('requests.get', get)
-    @patch('requests.post', post)
+    @patch('requests.Session.get', get)
+    @patch('requests.Session.post', post)
     def test_invalid_method(self):
         for method in ['GET', 'POST', 'nothing_of_both', 'something_else']:
             with self.assertRaises(ValueError):
@@ -96,7 +101,7 @@ class TestGerokApiCall(GerokFrontendTestBase):
             self.get.assert_not_called()
             self.post.assert_not_called()
 
-    @patch('requests.post', post)
+    @patch('requests.Session.post', post)
     def test_postdata_passed(self):
         postdata = {'foo': "bar"}
         do_api_call("", method='post', postdata=postdata)
@@ -116,13 +121,13 @@ class TestGerokApiCall(GerokFrontendTestBase):
             else:
                 raise ValueError("`method` must be one of ['get', 'post']!")
 
-    @patch('requests.get', get)
+    @patch('requests.Session.get', get)
     def test_auth_string_passed_get(self):
         tokens = ["", "foobar123", "dtrndturiaehc",
                   "54TRNEDr:-)/nyUfeg n:s lvℕΓΦ∃Δ∂ℝ⇐⊂6"]
         self.assert_token_passed(tokens, method='get')
 
-    @patch('requests.post', post)
+    @patch('requests.Session.post', post)
     def test_auth_string_passed_post(self):
         tokens = ["", "foobar123", "dtrndturiaehc",
                   "54TRNEDr:-)/nyUfeg n:s lvℕΓΦ∃Δ∂ℝ⇐⊂6"]
@@ -151,6 +156,152 @@ class GerokAPIConnectionErrorTestCase(GerokFrontendTestBase):
                 self.fail("ConnectionError not caught")
 
 
+class StubApiHandler(BaseHTTPRequestHandler):
+    """Answer with the json encoded request path, keeping the
+    connection alive
+
+    The status codes in ``server.statuses`` are answered first, then
+    ``200``.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def respond(self):
+        self.server.requests.append((self.command, self.path))
+        sleep(self.server.delay)
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        body = json.dumps({'path': self.path}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.respond()
+
+    def log_message(self, *args):
+        pass
+
+
+class StubApiServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StubApiHandler)
+        self.connections = 0
+        self.requests = []
+        self.statuses = []
+        self.delay = 0
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:{}/".format(self.server_port)
+
+
+class StubApiTestMixin:
+    def setUp(self):
+        super().setUp()
+        self.server = StubApiServer()
+        Thread(target=self.server.serve_forever, daemon=True,
+               kwargs={'poll_interval': 0.01}).start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        super().tearDown()
+
+
+class ApiClientTestCase(StubApiTestMixin, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = ApiClient(connect_timeout=1, read_timeout=0.2,
+                                retries=2, backoff_factor=0)
+
+    def test_connection_kept_alive(self):
+        for path in ['find', '1/traffic', '1/credit']:
+            response = self.client.request(self.server.url + path)
+            self.assertEqual(response.json(), {'path': '/' + path})
+
+        self.assertEqual(self.server.connections, 1)
+
+    def test_get_retried(self):
+        self.server.statuses = [503, 502]
+        response = self.client.request(self.server.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.client.stats['retries'], 2)
+
+    def test_retries_exhausted(self):
+        self.server.statuses = [503] * 3
+        response = self.client.request(self.server.url)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_post_not_retried(self):
+        self.server.statuses = [503]
+        response = self.client.request(self.server.url, method='post',
+                                       data={'login': 'foo'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(self.server.requests, [('POST', '/')])
+
+    def test_read_timeout_not_retried(self):
+        self.server.delay = 0.5
+        with self.assertRaises(requests.exceptions.ReadTimeout):
+            self.client.request(self.server.url)
+
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.client.stats['errors'], 1)
+
+    def test_connection_error_retried(self):
+        url = self.server.url
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.client.request(url)
+
+        self.assertEqual(self.client.stats['errors'], 3)
+        self.assertEqual(self.client.stats['retries'], 2)
+
+    def test_latencies_collected(self):
+        for _ in range(3):
+            self.client.request(self.server.url)
+        self.client.request(self.server.url, method='post')
+
+        latency = self.client.metrics['latency']
+        self.assertEqual(latency['get']['count'], 3)
+        self.assertEqual(latency['get']['buckets']['+Inf'], 3)
+        self.assertEqual(latency['post']['count'], 1)
+
+
+class GerokStubApiTestCase(StubApiTestMixin, GerokFrontendTestBase):
+    def setUp(self):
+        super().setUp()
+        self.app.extensions['gerok_api']['endpoint'] = self.server.url
+
+    def test_api_called(self):
+        self.assertEqual(do_api_call('find?login=foo'),
+                         {'path': '/find?login=foo'})
+
+    def test_unreachable_api_raises_connection_error(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+        with self.assertRaises(ConnectionError):
+            do_api_call('find?login=foo')
+
+
 def fake_api(users_dict, request, method='get', postdata=None):
     """A fake gerok api, replacing `do_api_call` for testing.
 
@@ -443,3 +594,18 @@ class TestGerokUser(GerokFrontendTestBase):
                     self.assertEqual(entry['output'], 0)
                     self.assertEqual(entry['throughput'], 0)
                     self.assertEqual(entry['credit'], 0)
+
+    @patch('sipa.model.gerok.user.do_api_call', api_mock)
+    def test_traffic_snapshot_loaded_once(self):
+        user_data = self.get_example_user('1')
+        user = User(user_data)
+
+        with self.app.test_request_context():
+            self.api_mock.reset_mock()
+            snapshot = user.traffic
+            user.traffic
+            # one call for the credit, one for the history
+            self.assertEqual(self.api_mock.call_count, 2)
+
+        self.assertEqual(snapshot.credit, user.credit)
+        self.assertEqual(snapshot.history, user.traffic_history)
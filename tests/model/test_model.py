@@ -4,11 +4,11 @@ from os import urandom
 from unittest import TestCase
 from unittest.mock import MagicMock
 
-from ipaddress import IPv4Network
+from ipaddress import IPv4Address, IPv4Network
 from flask import Flask
 
-from sipa.model import Backends
-from sipa.model.datasource import DataSource, Dormitory
+from sipa.model import Backends, AVAILABLE_DATASOURCES
+from sipa.model.datasource import DataSource, Dormitory, SubnetIndex
 from sipa.model.user import BaseUser
 
 
@@ -98,6 +98,128 @@ class TestBackendInitializationCase(TestCase):
 
         # TODO: Find an ip not in any dormitory
 
+    def test_dormitory_from_invalid_ip(self):
+        for ip in ["", "foo", "127.0.0.256", None]:
+            with self.subTest(ip=ip):
+                self.assertIsNone(self.backends.dormitory_from_ip(ip))
+
+
+class BackendsOverlappingSubnetsTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = Flask('sipa')
+        self.app.config['BACKENDS'] = ['foo', 'bar']
+        self.datasources = [
+            DataSource(name=name, user_class=object, mail_server="")
+            for name in self.app.config['BACKENDS']
+        ]
+
+    def test_overlapping_subnets_rejected(self):
+        foo, bar = self.datasources
+        Dormitory(name='foo', display_name="", datasource=foo,
+                  subnets=[IPv4Network('10.0.0.0/16')])
+        Dormitory(name='bar', display_name="", datasource=bar,
+                  subnets=[IPv4Network('10.0.3.0/24')])
+
+        backends = Backends(available_datasources=self.datasources)
+        with self.assertRaises(ValueError):
+            backends.init_app(self.app)
+
+    def test_conflicting_dormitory_not_indexed(self):
+        foo, bar = self.datasources
+        existing = Dormitory(name='foo', display_name="", datasource=foo,
+                             subnets=[IPv4Network('10.0.0.0/24')])
+        conflicting = Dormitory(name='bar', display_name="", datasource=bar,
+                                subnets=[IPv4Network('10.0.1.0/24'),
+                                         IPv4Network('10.0.0.128/25')])
+
+        backends = Backends(available_datasources=self.datasources)
+        backends._register_dormitory(existing)
+        with self.assertRaises(ValueError):
+            backends._register_dormitory(conflicting)
+
+        self.assertEqual(len(backends._subnet_index), 1)
+        self.assertIsNone(backends.dormitory_from_ip('10.0.1.1'))
+        self.assertEqual(backends.dormitory_from_ip('10.0.0.129'), existing)
+        self.assertIsNone(backends.get_dormitory('bar'))
+
+
+class SubnetIndexTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = SubnetIndex()
+        self.subnets = {
+            'foo': [IPv4Network('10.0.0.0/24'), IPv4Network('10.0.2.0/23')],
+            'bar': [IPv4Network('10.0.1.0/25'), IPv4Network('192.168.0.0/16')],
+        }
+        for name, subnets in self.subnets.items():
+            for subnet in subnets:
+                self.index.add(subnet, name)
+
+    def get(self, ip):
+        return self.index.get(int(IPv4Address(ip)))
+
+    def test_addresses_found(self):
+        for name, subnets in self.subnets.items():
+            for subnet in subnets:
+                for address in [subnet.network_address,
+                                subnet.broadcast_address]:
+                    with self.subTest(address=address):
+                        self.assertEqual(self.get(address), name)
+
+    def test_addresses_outside_not_found(self):
+        for ip in ['9.255.255.255', '10.0.1.128', '10.0.4.0', '255.255.255.255',
+                   '0.0.0.0']:
+            with self.subTest(ip=ip):
+                self.assertIsNone(self.get(ip))
+
+    def test_overlapping_subnets_rejected(self):
+        for subnet in ['10.0.0.128/25', '10.0.0.0/8', '10.0.1.64/26',
+                       '192.168.255.255/32', '0.0.0.0/0']:
+            with self.subTest(subnet=subnet), self.assertRaises(ValueError):
+                self.index.add(IPv4Network(subnet), 'baz')
+
+    def test_add_all_rolled_back_on_overlap(self):
+        for subnets in [['10.0.4.0/24', '10.0.0.128/25'],
+                        ['10.0.4.0/24', '10.0.4.128/25']]:
+            with self.subTest(subnets=subnets):
+                with self.assertRaises(ValueError):
+                    self.index.add_all(map(IPv4Network, subnets), 'baz')
+                self.assertEqual(len(self.index), 4)
+                self.assertIsNone(self.get('10.0.4.0'))
+                self.assertEqual(self.get('10.0.0.128'), 'foo')
+
+    def test_adjacent_subnet_accepted(self):
+        self.index.add(IPv4Network('10.0.1.128/25'), 'baz')
+        self.assertEqual(self.get('10.0.1.128'), 'baz')
+        self.assertEqual(self.get('10.0.1.127'), 'bar')
+        self.assertEqual(self.get('10.0.2.0'), 'foo')
+
+    def test_same_result_as_subnet_collection(self):
+        """Test the index agrees with a linear scan over the configured
+        dormitories"""
+        index = SubnetIndex()
+        dormitories = [dorm for dsrc in AVAILABLE_DATASOURCES
+                       for dorm in dsrc.dormitories]
+        for dorm in dormitories:
+            for subnet in dorm.subnets.subnets:
+                index.add(subnet, dorm)
+
+        def linear_scan(address):
+            for dorm in dormitories:
+                if address in dorm.subnets:
+                    return dorm
+
+        for dorm in dormitories:
+            for subnet in dorm.subnets.subnets:
+                for address in [subnet.network_address - 1,
+                                subnet.network_address,
+                                subnet.broadcast_address,
+                                subnet.broadcast_address + 1]:
+                    with self.subTest(address=address):
+                        self.assertEqual(index.get(int(address)),
+                                         linear_scan(address))
+
 
 class TestBaseUserCase(TestCase):
     def test_BaseUser_is_abstract(self):
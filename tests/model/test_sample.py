@@ -1,6 +1,9 @@
+from datetime import datetime
+
 import sipa.model.sample
 from sipa.model.fancy_property import (ActiveProperty, Capabilities,
                                        UnsupportedProperty, NO_CAPABILITIES)
+from sipa.model.misc import FinanceLogEntry
 
 from tests.base import SampleFrontendTestBase
 
@@ -99,3 +102,41 @@ class TestSampleUserCase(SampleFrontendTestBase):
             assert 0 <= day['output']
             self.assertEqual(day['throughput'], day['input'] + day['output'])
             assert 0 <= day['credit'] <= 1024**2 * 63
+
+    def test_traffic_snapshot_shared_per_request(self):
+        with self.app.test_request_context():
+            snapshot = self.user.traffic
+            self.assertIs(self.user.traffic, snapshot)
+            self.assertIs(self.User('test').traffic, snapshot)
+
+        with self.app.test_request_context():
+            self.assertIsNot(self.user.traffic, snapshot)
+
+        assert 0 <= snapshot.credit <= 1024**2 * 63
+        self.assertEqual(len(snapshot.history), 7)
+
+
+class SampleFinanceLogPageTestCase(SampleFrontendTestBase):
+    def setUp(self):
+        self.user = sipa.model.sample.datasource.user_class('test')
+
+    def test_newest_page_first_with_balance(self):
+        page = self.user.finance_log_page(limit=2)
+
+        self.assertEqual(page.entries, [
+            FinanceLogEntry(datetime(2016, 4, 30), -3.5, 17.5),
+            FinanceLogEntry(datetime(2016, 5, 30), -3.5, 14),
+        ])
+        self.assertEqual(page.next_key, '1')
+
+    def test_last_page(self):
+        page = self.user.finance_log_page(before='1', limit=2)
+
+        self.assertEqual(page.entries,
+                         [FinanceLogEntry(datetime(2016, 4, 1), 21, 21)])
+        self.assertIsNone(page.next_key)
+
+    def test_invalid_key(self):
+        for key in ['foo', '-1', '4']:
+            with self.subTest(key=key), self.assertRaises(ValueError):
+                self.user.finance_log_page(before=key)
@@ -1,3 +1,4 @@
+import pickle
 from contextlib import contextmanager
 from datetime import datetime
 from itertools import permutations
@@ -82,12 +83,33 @@ class UserNoDBTestCase(TestCase):
                     self.assertEqual(user.define_group(), group)
         return
 
+    @patch('sipa.model.wu.user.UserDB', userdb_mock)
+    def test_define_group_from_fetched_groups(self):
+        sample_groups = [
+            (set(), 'passive'),
+            ({'Aktiv'}, 'active'),
+            ({'Exaktiv'}, 'exactive'),
+            ({'Aktiv', 'Exaktiv'}, 'active'),
+        ]
+
+        for ldap_groups, group in sample_groups:
+            with patch('sipa.model.wu.user.search_in_group') as search_mock, \
+                    self.subTest(ldap_groups=ldap_groups):
+                user = User(uid='uid', realname="", mail="",
+                            ldap_groups=ldap_groups)
+
+                self.assertEqual(user.group, group)
+                self.assertFalse(search_mock.called)
+
     @patch('sipa.model.wu.user.UserDB', userdb_mock)
     def test_get_constructor(self):
         test_users = [
-            {'uid': "uid1", 'name': "Name Eins", 'mail': "test@foo.bar"},
-            {'uid': "uid2", 'name': "Mareike Musterfrau", 'mail': "test@foo.baz"},
-            {'uid': "uid3", 'name': "Deine Mutter", 'mail': "shizzle@damn.onion"},
+            {'uid': "uid1", 'name': "Name Eins", 'mail': "test@foo.bar",
+             'groups': set()},
+            {'uid': "uid2", 'name': "Mareike Musterfrau", 'mail': "test@foo.baz",
+             'groups': set()},
+            {'uid': "uid3", 'name': "Deine Mutter", 'mail': "shizzle@damn.onion",
+             'groups': set()},
         ]
 
         for test_user in test_users:
@@ -263,6 +285,22 @@ class TestUserInitializedCase(WuAtlantisFakeDBInitialized):
                                                          original_id)
         )
 
+    def test_snapshot_roundtrip(self):
+        # populate `_cached_nutzer`
+        self.assertEqual(self.user.address, self.nutzer.address)
+        state = self.user.__getstate__()
+        self.assertNotIn('_cached_nutzer', state)
+        self.assertNotIn('_userdb', state)
+
+        restored = User.__new__(User)
+        restored.__setstate__(pickle.loads(pickle.dumps(state)))
+
+        self.assertEqual(restored, self.user)
+        self.assertEqual(restored.group, self.user.group)
+        self.assertEqual(restored.mail, self.mail)
+        self.assertEqual(restored.address, self.nutzer.address)
+        self.assertIs(restored.userdb.user, restored)
+
 
 class ComputerWithoutAliasTestCase(WuAtlantisFakeDBInitialized):
     def setUp(self):
@@ -418,8 +456,91 @@ class TrafficOneComputerTestCase(OneUserWithCredit):
 
         for expected_traffic, traffic_entry in combined_history:
             with self.subTest(traffic_entry=traffic_entry):
-                self.assertEqual(traffic_entry['input'], traffic_entry['input'])
-                self.assertEqual(traffic_entry['output'], traffic_entry['output'])
+                # the columns round to integers
+                self.assertAlmostEqual(traffic_entry['input'],
+                                       expected_traffic.input, delta=1)
+                self.assertAlmostEqual(traffic_entry['output'],
+                                       expected_traffic.output, delta=1)
+
+
+class TrafficSeveralComputersTestCase(OneUserWithCredit):
+    def setUp(self):
+        super().setUp()
+        self.computers = ComputerFactory.create_batch(3, nutzer=self.nutzer)
+        self.expected_traffic = {}
+        for timetag in self.timetag_range:
+            entries = [TrafficFactory.create(timetag=timetag, ip=computer.c_ip)
+                       for computer in self.computers]
+            self.expected_traffic[timetag] = (
+                sum(entry.input for entry in entries),
+                sum(entry.output for entry in entries),
+            )
+            # traffic of someone else
+            TrafficFactory.create(timetag=timetag, ip="141.30.0.1")
+        db.session.commit()
+
+        self.user = self.create_user_ldap_patched(
+            uid=self.nutzer.unix_account,
+            name=None,
+            mail=None,
+        )
+
+    def test_traffic_summed_up_per_day(self):
+        history = self.user.traffic_history
+
+        self.assertEqual(len(history), 7)
+        for timetag, entry in zip(self.timetag_range[-7:], history):
+            expected_input, expected_output = self.expected_traffic[timetag]
+            with self.subTest(timetag=timetag):
+                # the columns round to integers
+                self.assertAlmostEqual(entry['input'], expected_input,
+                                       delta=3)
+                self.assertAlmostEqual(entry['output'], expected_output,
+                                       delta=3)
+                self.assertEqual(entry['throughput'],
+                                 entry['input'] + entry['output'])
+
+    def test_history_uses_one_traffic_query(self):
+        with self.record_queries('traffic') as statements:
+            self.user.traffic_history
+
+        self.assertEqual(len(statements), 1)
+
+    def test_credit_subtracts_todays_traffic(self):
+        latest = self.credit_entries[-1]
+        expected_input, expected_output = self.expected_traffic[latest.timetag]
+
+        with self.record_queries('traffic') as statements:
+            credit = self.user.credit
+
+        self.assertAlmostEqual(credit, latest.amount - expected_input
+                               - expected_output, delta=6)
+        self.assertEqual(len(statements), 1)
+
+    def test_traffic_snapshot_consistent(self):
+        with self.app.test_request_context():
+            with self.record_queries('traffic') as statements:
+                snapshot = self.user.traffic
+                self.assertIs(self.user.traffic, snapshot)
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(snapshot.credit, self.user.credit)
+        self.assertEqual(snapshot.history, self.user.traffic_history)
+
+    def test_no_computers(self):
+        for computer in self.computers:
+            db.session.delete(computer)
+        db.session.commit()
+        self.user = self.create_user_ldap_patched(
+            uid=self.nutzer.unix_account,
+            name=None,
+            mail=None,
+        )
+
+        history = self.user.traffic_history
+        self.assertEqual([(e['input'], e['output']) for e in history],
+                         [(0, 0)] * 7)
+        self.assertEqual(self.user.credit, self.credit_entries[-1].amount)
 
 
 class IPMaskValidityChecker(TestCase):
@@ -497,6 +618,20 @@ class FinanceBalanceTestCase(OneUserWithCredit):
         expected_date = max(t.datum for t in self.transactions)
         self.assertEqual(self.user.last_finance_update, expected_date)
 
+    def test_finance_date_cached(self):
+        self.user.last_finance_update
+        db.session.add(Buchung(wert=350, soll_uid=self.nutzer.nutzer_id,
+                               haben_uid=None, bes="Semesterbeitrag 06/16",
+                               datum=datetime(2016, 6, 30)))
+        db.session.commit()
+
+        expected_date = max(t.datum for t in self.transactions)
+        self.assertEqual(self.user.last_finance_update, expected_date)
+
+        self.app.extensions['finance_update_cache'].clear()
+        self.assertEqual(self.user.last_finance_update,
+                         datetime(2016, 6, 30).date())
+
     def test_finance_logs_is_duple(self):
         for log in self.user.finance_logs:
             with self.subTest(log=log):
@@ -539,3 +674,48 @@ class HabenSollSwitchedTestCase(OneUserWithCredit):
     def test_user_has_correct_balance(self):
         expected_balance = 3.5
         self.assertEqual(self.user.finance_balance, expected_balance)
+
+
+class FinanceBalanceAggregatedTestCase(OneUserWithCredit):
+    def setUp(self):
+        super().setUp()
+        self.transactions = [
+            Buchung(wert=350, soll_uid=self.nutzer.nutzer_id, haben_uid=None,
+                    bes="Semesterbeitrag 04/16", datum=datetime(2016, 4, 30)),
+            # booked from the nutzer onto itself
+            Buchung(wert=200, soll_uid=self.nutzer.nutzer_id,
+                    haben_uid=self.nutzer.nutzer_id,
+                    bes="Umbuchung", datum=datetime(2016, 5, 1)),
+            # not concerning the nutzer
+            Buchung(wert=500, soll_uid=self.nutzer.nutzer_id + 1,
+                    haben_uid=None, bes="Semesterbeitrag 04/16",
+                    datum=datetime(2016, 4, 30)),
+        ]
+        for t in self.transactions:
+            db.session.add(t)
+        db.session.commit()
+        self.user = self.create_user_ldap_patched(
+            uid=self.nutzer.unix_account,
+            name=None,
+            mail=None,
+        )
+
+    def test_row_on_both_sides_counted_once(self):
+        self.assertEqual(len(self.user.finance_logs), 2)
+
+    def test_balance_matches_logs(self):
+        self.assertEqual(self.user.finance_balance,
+                         sum(t.value for t in self.user.finance_logs))
+
+    def test_balance_is_one_aggregate_query(self):
+        with self.record_queries('userman') as statements:
+            self.user.finance_balance
+
+        self.assertEqual(len(statements), 1)
+        self.assertIn("sum(", statements[0].lower())
+        self.assertIn("union all", statements[0].lower())
+
+    def test_balance_without_transactions(self):
+        Buchung.query.delete()
+        db.session.commit()
+        self.assertEqual(self.user.finance_balance, 0)
@@ -3,7 +3,10 @@ from unittest.mock import MagicMock, patch
 
 from flask import Flask
 
+import ldap3
+
 from sipa.model.wu.database_utils import init_atlantis, init_userdb, init_db
+from sipa.model.wu.ldap_utils import init_ldap
 from sipa.utils.exceptions import InvalidConfiguration
 from sipa.model import Backends
 
@@ -64,6 +67,34 @@ class InitUserDBTestCase(WuInitializationTestBase):
         self.assertIn('db_helios', self.app.extensions)
 
 
+class InitLdapTestCase(WuInitializationTestBase):
+    KEYS = {
+        'WU_LDAP_HOST': 'localhost',
+        'WU_LDAP_PORT': 389,
+        'WU_LDAP_SEARCH_USER_BASE': 'ou=users,dc=wh2,dc=tu-dresden,dc=de',
+        'WU_LDAP_SEARCH_GROUP_BASE': 'ou=groups,dc=wh2,dc=tu-dresden,dc=de',
+        'WU_LDAP_SEARCH_USER': 'cn=search,dc=wh2,dc=tu-dresden,dc=de',
+        'WU_LDAP_SEARCH_PASSWORD': 'password',
+        'WU_LDAP_POOL_SIZE': 2,
+        'WU_LDAP_POOL_IDLE_TIMEOUT': 60,
+        'WU_LDAP_POOL_CHECK_INTERVAL': 10,
+    }
+
+    def test_unconfigured_init_fails(self):
+        with self.assertRaises(InvalidConfiguration):
+            init_ldap(self.app)
+
+    def test_complete_config_sets_extensions(self):
+        self.app.config.update(**self.KEYS)
+        init_ldap(self.app)
+
+        self.assertIsInstance(self.app.extensions['ldap']['server'], ldap3.Server)
+        pool = self.app.extensions['ldap_pool']
+        self.assertEqual(pool.max_size, 2)
+        self.assertEqual(pool.idle_timeout, 60)
+        self.assertEqual(pool.check_interval, 10)
+
+
 class InitDBTestCase(WuInitializationTestBase):
     """Test Case for the cumulated `init_db` function"""
     def raise_invalid_conf(*a, **kw):
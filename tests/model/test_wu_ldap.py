@@ -0,0 +1,241 @@
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import ldap3
+from flask import Flask
+
+from sipa.model.wu.ldap_utils import LdapConnectionPool, LdapConnector, \
+    common_base, is_within, search_in_group
+from sipa.model.wu.user import User
+
+
+SYSTEM_USER = 'cn=search,dc=wh2,dc=tu-dresden,dc=de'
+USER_BASE = 'ou=users,dc=wh2,dc=tu-dresden,dc=de'
+GROUP_BASE = 'ou=groups,dc=wh2,dc=tu-dresden,dc=de'
+
+
+class MockLdapTestBase(TestCase):
+    """Provides a factory for system-bound connections against an
+    ``ldap3`` mock server"""
+    def setUp(self):
+        super().setUp()
+        self.server = ldap3.Server('fake', get_info=ldap3.OFFLINE_SLAPD_2_4)
+        self.connections = []
+
+    def create_connection(self):
+        connection = ldap3.Connection(self.server,
+                                      user=SYSTEM_USER,
+                                      password='password',
+                                      client_strategy=ldap3.MOCK_SYNC,
+                                      check_names=True,
+                                      raise_exceptions=True)
+        # mocked entries only live in the strategy of one connection
+        connection.strategy.add_entry(SYSTEM_USER, {'userPassword': 'password',
+                                                    'sn': 'search'})
+        connection.strategy.add_entry('uid=foo,' + USER_BASE, {
+            'uid': 'foo',
+            'gecos': "Foo Bar",
+            'mail': 'foo@bar.baz',
+        })
+        connection.strategy.add_entry('uid=bar,' + USER_BASE, {
+            'uid': 'bar',
+            'gecos': "Bar Baz",
+        })
+        connection.strategy.add_entry('cn=Aktiv,' + GROUP_BASE, {
+            'objectClass': 'groupOfNames',
+            'cn': 'Aktiv',
+            'memberuid': ['foo'],
+        })
+        connection.strategy.add_entry('cn=Exaktiv,' + GROUP_BASE, {
+            'objectClass': 'groupOfNames',
+            'cn': 'Exaktiv',
+            'memberuid': ['bar'],
+        })
+        connection.bind()
+        # the mock strategy does not collect usage statistics
+        connection.search = MagicMock(wraps=connection.search)
+        self.connections.append(connection)
+        return connection
+
+    @property
+    def search_count(self):
+        return sum(c.search.call_count for c in self.connections)
+
+
+class LdapConnectionPoolTestCase(MockLdapTestBase):
+    def setUp(self):
+        super().setUp()
+        self.pool = LdapConnectionPool(self.create_connection, max_size=2,
+                                       idle_timeout=300, check_interval=30)
+
+    def test_connection_is_bound(self):
+        with self.pool.connection() as connection:
+            self.assertTrue(connection.bound)
+            connection.search(USER_BASE, '(uid=foo)', ldap3.SUBTREE)
+            self.assertEqual(len(connection.response), 1)
+
+    def test_connection_reused(self):
+        for _ in range(3):
+            with self.pool.connection():
+                pass
+
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(self.pool.metrics['created'], 1)
+        self.assertEqual(self.pool.metrics['reused'], 2)
+        self.assertEqual(self.pool.metrics['idle'], 1)
+
+    def test_surplus_connections_closed(self):
+        with self.pool.connection(), self.pool.connection(), \
+                self.pool.connection():
+            pass
+
+        self.assertEqual(len(self.connections), 3)
+        self.assertEqual(self.pool.metrics['idle'], 2)
+        self.assertEqual(self.pool.metrics['overflow'], 1)
+        self.assertEqual(sum(c.closed for c in self.connections), 1)
+
+    def test_idle_connection_expires(self):
+        with patch('sipa.model.wu.ldap_utils.monotonic', return_value=0):
+            with self.pool.connection():
+                pass
+
+        with patch('sipa.model.wu.ldap_utils.monotonic', return_value=301):
+            with self.pool.connection() as connection:
+                self.assertIsNot(connection, self.connections[0])
+
+        self.assertTrue(self.connections[0].closed)
+        self.assertEqual(self.pool.metrics['discarded'], 1)
+
+    def test_stale_connection_probed(self):
+        with patch('sipa.model.wu.ldap_utils.monotonic', return_value=0):
+            with self.pool.connection() as connection:
+                pass
+
+        probe = MagicMock(side_effect=ldap3.LDAPSocketReceiveError)
+        with patch('sipa.model.wu.ldap_utils.monotonic', return_value=31), \
+                patch.object(connection, 'search', probe):
+            with self.pool.connection() as new_connection:
+                self.assertIsNot(new_connection, connection)
+
+        self.assertTrue(probe.called)
+        self.assertEqual(self.pool.metrics['discarded'], 1)
+
+    def test_closed_connection_discarded(self):
+        with self.pool.connection() as connection:
+            pass
+        connection.unbind()
+
+        with self.pool.connection() as new_connection:
+            self.assertIsNot(new_connection, connection)
+        self.assertEqual(self.pool.metrics['discarded'], 1)
+
+    def test_connection_discarded_on_communication_error(self):
+        with self.assertRaises(ldap3.LDAPSocketReceiveError):
+            with self.pool.connection():
+                raise ldap3.LDAPSocketReceiveError
+
+        self.assertEqual(self.pool.metrics['idle'], 0)
+        self.assertEqual(self.pool.metrics['discarded'], 1)
+        self.assertTrue(self.connections[0].closed)
+
+    def test_connection_kept_on_other_errors(self):
+        with self.assertRaises(ldap3.LDAPNoSuchObjectResult):
+            with self.pool.connection():
+                raise ldap3.LDAPNoSuchObjectResult
+
+        self.assertEqual(self.pool.metrics['idle'], 1)
+
+    def test_clear_closes_idle_connections(self):
+        with self.pool.connection(), self.pool.connection():
+            pass
+        self.pool.clear()
+
+        self.assertEqual(self.pool.metrics['idle'], 0)
+        self.assertTrue(all(c.closed for c in self.connections))
+
+
+class PooledLdapFunctionsTestCase(MockLdapTestBase):
+    def setUp(self):
+        super().setUp()
+        self.app = Flask('sipa')
+        self.pool = LdapConnectionPool(self.create_connection)
+        self.app.extensions['ldap'] = {
+            'search_user_base': USER_BASE,
+            'search_group_base': GROUP_BASE,
+        }
+        self.app.extensions['ldap_pool'] = self.pool
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        self.app_context.pop()
+        super().tearDown()
+
+    def test_fetch_user(self):
+        user = LdapConnector.fetch_user('foo')
+        self.assertEqual(user['dn'], 'uid=foo,' + USER_BASE)
+        self.assertEqual(user['uid'], 'foo')
+        self.assertEqual(user['name'], "Foo Bar")
+        self.assertEqual(user['mail'], 'foo@bar.baz')
+
+    def test_fetch_nonexistent_user(self):
+        self.assertIsNone(LdapConnector.fetch_user('baz'))
+
+    def test_search_in_group(self):
+        self.assertTrue(search_in_group('foo', 'Aktiv'))
+        self.assertFalse(search_in_group('foo', 'Exaktiv'))
+
+    def test_lookups_share_one_connection(self):
+        LdapConnector.fetch_user('foo')
+        search_in_group('foo', 'Aktiv')
+        search_in_group('foo', 'Exaktiv')
+
+        self.assertEqual(len(self.connections), 1)
+        self.assertEqual(self.pool.metrics['reused'], 2)
+
+    def test_fetch_user_with_groups(self):
+        user = LdapConnector.fetch_user('foo', groups=('Aktiv', 'Exaktiv'))
+        self.assertEqual(user['uid'], 'foo')
+        self.assertEqual(user['name'], "Foo Bar")
+        self.assertEqual(user['groups'], {'Aktiv'})
+        self.assertEqual(self.search_count, 1)
+
+    def test_fetch_nonexistent_user_with_groups(self):
+        self.assertIsNone(LdapConnector.fetch_user('baz', groups=('Aktiv',)))
+
+    def test_fetch_user_with_groups_disjunct_bases(self):
+        self.app.extensions['ldap']['search_group_base'] = 'ou=groups,o=other'
+        user = LdapConnector.fetch_user('foo', groups=('Aktiv',))
+
+        self.assertEqual(user['groups'], set())
+        self.assertEqual(self.search_count, 2)
+
+    @patch('sipa.model.wu.user.UserDB', MagicMock())
+    def test_user_get_uses_single_search(self):
+        for uid, group in [('foo', 'active'), ('bar', 'exactive')]:
+            with self.subTest(uid=uid):
+                self.app.extensions['ldap_pool'] = LdapConnectionPool(
+                    self.create_connection
+                )
+                self.connections.clear()
+
+                user = User.get(uid)
+
+                self.assertEqual(user.group, group)
+                self.assertEqual(self.search_count, 1)
+
+
+class DnUtilsTestCase(TestCase):
+    def test_is_within(self):
+        self.assertTrue(is_within('uid=foo,' + USER_BASE, USER_BASE))
+        self.assertTrue(is_within(USER_BASE, USER_BASE))
+        self.assertTrue(is_within('uid=foo, OU=Users,dc=wh2,dc=tu-dresden,dc=de',
+                                  USER_BASE))
+        self.assertFalse(is_within('uid=foo,' + GROUP_BASE, USER_BASE))
+        self.assertFalse(is_within('dc=tu-dresden,dc=de', USER_BASE))
+
+    def test_common_base(self):
+        self.assertEqual(common_base(USER_BASE, GROUP_BASE),
+                         'dc=wh2,dc=tu-dresden,dc=de')
+        self.assertEqual(common_base(USER_BASE, USER_BASE), USER_BASE)
+        self.assertEqual(common_base(USER_BASE, 'ou=groups,o=other'), '')
@@ -0,0 +1,469 @@
+import json
+import os
+from os.path import dirname
+from multiprocessing import Pipe, get_context
+from tempfile import TemporaryDirectory, gettempdir
+from unittest.mock import patch
+
+from flask import render_template, url_for
+
+from sipa.babel import locale_preferences
+from sipa.blueprints.pages import load_dynamic_json
+from sipa.content import default_version_file
+from sipa.flatpages import MAX_PAGE_MEMO_SIZE, cf_pages, html_cache
+from sipa.model import backends
+from tests.base import SampleFrontendTestBase
+
+NEWS_TEMPLATE = """\
+title: News {index}
+author: foo
+date: 2016-01-{day:02d}
+
+Something happened.
+"""
+
+
+class FlatPagesTestBase(SampleFrontendTestBase):
+    """Provide an app serving the pages of a temporary directory"""
+    def create_app(self):
+        self.content_dir = TemporaryDirectory()
+        os.mkdir(os.path.join(self.content_dir.name, 'news'))
+        return super().create_app(additional_config={
+            'FLATPAGES_ROOT': self.content_dir.name,
+            'CONTENT_VERSION_FILE': os.path.join(self.content_dir.name,
+                                                 'content.version'),
+        })
+
+    def tearDown(self):
+        self.content_dir.cleanup()
+        super().tearDown()
+
+    def write_news(self, index, locale='de', day=None):
+        path = os.path.join(self.content_dir.name, 'news',
+                            'news-{}.{}.md'.format(index, locale))
+        if day is None:
+            day = index % 28 + 1
+        with open(path, 'w') as f:
+            f.write(NEWS_TEMPLATE.format(index=index, day=day))
+        return path
+
+    @property
+    def news(self):
+        return cf_pages.get_articles_of_category('news')
+
+
+class ContentVersionReloadTestCase(FlatPagesTestBase):
+    def setUp(self):
+        super().setUp()
+        for index in range(3):
+            self.write_news(index)
+        cf_pages.reload()
+
+    def test_unchanged_content_not_reloaded(self):
+        with patch.object(cf_pages, '_build_categories',
+                          wraps=cf_pages._build_categories) as build:
+            for _ in range(3):
+                self.assert200(self.client.get(url_for('news.show')))
+
+        self.assertEqual(build.call_count, 0)
+        self.assertEqual(len(self.news), 3)
+
+    def test_new_article_loaded(self):
+        self.write_news(3)
+
+        self.assert200(self.client.get(url_for('news.show')))
+        self.assertEqual(len(self.news), 4)
+        self.assertIn(b'News 3', self.client.get(url_for('news.show')).data)
+
+    def test_edited_article_reloaded(self):
+        path = self.write_news(0)
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        self.assertTrue(cf_pages.reload_if_changed())
+        self.assertFalse(cf_pages.reload_if_changed())
+
+    def test_removed_article_dropped(self):
+        os.remove(self.write_news(0))
+
+        self.assertTrue(cf_pages.reload_if_changed())
+        self.assertEqual(len(self.news), 2)
+
+    def test_articles_do_not_pile_up(self):
+        for _ in range(3):
+            cf_pages.reload()
+
+        self.assertEqual(len(self.news), 3)
+
+    def test_tree_swapped(self):
+        old_root = cf_pages.root_category
+        self.write_news(3)
+        cf_pages.reload_if_changed()
+
+        self.assertIsNot(cf_pages.root_category, old_root)
+        self.assertEqual(len(old_root.categories['news']._articles), 3)
+
+    def test_reload_skipped_while_reloading(self):
+        self.write_news(3)
+        with cf_pages._reload_lock:
+            self.assertFalse(cf_pages.reload_if_changed())
+        self.assertTrue(cf_pages.reload_if_changed())
+
+
+class NewsIndexTestCase(FlatPagesTestBase):
+    def setUp(self):
+        super().setUp()
+        for index in range(15):
+            self.write_news(index)
+        # the english version is the newest article
+        self.write_news(0, locale='en', day=28)
+        cf_pages.reload()
+        self.category = cf_pages.get_category('news')
+
+    def test_sorted_by_date(self):
+        dated = self.category.get_index(('de',)).dated
+        dates = [article.localized_pages['de'].meta['date']
+                 for article in dated]
+
+        self.assertEqual(len(dated), 15)
+        self.assertEqual(dates, sorted(dates, reverse=True))
+
+    def test_index_per_language(self):
+        for languages, newest in [(('de',), 'news-14'),
+                                  (('en', 'de'), 'news-0'),
+                                  (('fr', 'en'), 'news-0'),
+                                  (('de', 'en'), 'news-14')]:
+            with self.subTest(languages=languages):
+                index = self.category.get_index(languages)
+                self.assertEqual(index.dated[0].id, newest)
+                self.assertEqual(index.by_basename['news-0'].id, 'news-0')
+
+    def test_index_built_once(self):
+        first = self.category.get_index(('de',))
+        self.assertIs(self.category.get_index(('de', 'fr')), first)
+        self.assertEqual(len(self.category._indexes), 1)
+
+    def test_index_dropped_on_reload(self):
+        self.write_news(15)
+        cf_pages.reload_if_changed()
+
+        index = cf_pages.get_category('news').get_index(('de',))
+        self.assertEqual(len(index.dated), 16)
+
+    def test_news_paginated(self):
+        rv = self.client.get(url_for('news.show', start=0, end=4))
+        self.assert200(rv)
+        self.assertEqual(len(self.get_context_variable('articles')), 5)
+        self.assertEqual(self.get_context_variable('next_range'),
+                         {'start': 5, 'end': 9})
+
+    def test_show_news(self):
+        self.assert200(self.client.get(url_for('news.show_news',
+                                               filename='news-3')))
+        self.assertStatus(self.client.get(url_for('news.show_news',
+                                                  filename='news-99')),
+                          404)
+
+
+class ArticleHtmlTestCase(FlatPagesTestBase):
+    def setUp(self):
+        super().setUp()
+        path = os.path.join(self.content_dir.name, 'news', 'links.de.md')
+        with open(path, 'w') as f:
+            f.write("title: Links\ndate: 2016-01-01\n\n[News](/news/)\n")
+        cf_pages.reload()
+        self.article = cf_pages.get('news', 'links')
+        self.page = self.article.localized_page
+
+    def test_rendered_on_reload(self):
+        self.assertIn('html', self.page.__dict__)
+
+    def test_links_rewritten_per_script_root(self):
+        for script_root, link in [('', '/news/'),
+                                  ('/sipa', '/sipa/news/'),
+                                  ('', '/news/')]:
+            with self.subTest(script_root=script_root), \
+                    self.app.test_request_context(
+                        base_url='http://localhost' + script_root
+                    ):
+                self.assertIn('href="{}"'.format(link), self.article.html)
+
+    def test_markdown_rendered_once(self):
+        with patch.object(self.page, 'html_renderer') as renderer:
+            for script_root in ['', '/sipa', '/foo']:
+                with self.app.test_request_context(
+                        base_url='http://localhost' + script_root
+                ):
+                    self.article.html
+
+        self.assertFalse(renderer.called)
+
+    def test_cached_per_content_version(self):
+        with self.app.test_request_context():
+            self.article.html
+        self.assertIn((self.page.path, cf_pages.content_version, ''),
+                      html_cache._entries)
+
+        self.write_news(0)
+        cf_pages.reload_if_changed()
+        with self.app.test_request_context():
+            cf_pages.get('news', 'links').html
+        self.assertIn((self.page.path, cf_pages.content_version, ''),
+                      html_cache._entries)
+
+
+class LocalizedPageTestCase(FlatPagesTestBase):
+    def setUp(self):
+        super().setUp()
+        self.write_news(0, locale='de')
+        self.write_news(0, locale='en')
+        cf_pages.reload()
+        self.article = cf_pages.get('news', 'news-0')
+
+    def request_context(self, locale):
+        return self.app.test_request_context(
+            '/?locale={}'.format(locale),
+            headers={'Accept-Language': locale},
+        )
+
+    def test_preferences_computed_once_per_request(self):
+        with patch('sipa.babel._locale_preferences',
+                   return_value=[]) as preferences:
+            for _ in range(2):
+                with self.request_context('de'):
+                    for _ in range(3):
+                        locale_preferences()
+
+        self.assertEqual(preferences.call_count, 2)
+
+    def test_page_resolved_per_language(self):
+        for locale in ['de', 'en', 'de']:
+            with self.subTest(locale=locale), self.request_context(locale):
+                self.assertEqual(self.article.localized_page,
+                                 self.article.localized_pages[locale])
+
+    def test_page_memoized(self):
+        with patch.object(self.article, 'page_for',
+                          wraps=self.article.page_for) as page_for:
+            for _ in range(2):
+                with self.request_context('en'):
+                    self.article.localized_page
+                    self.article.title
+                    self.article.rank
+
+        self.assertEqual(page_for.call_count, 1)
+
+    def test_memo_bounded(self):
+        self.article._page_memo.update({('xx', str(index)): None
+                                        for index in range(MAX_PAGE_MEMO_SIZE)})
+        with self.request_context('en'):
+            page = self.article.localized_page
+
+        self.assertEqual(list(self.article._page_memo.values()), [page])
+
+
+class NavigationTestCase(FlatPagesTestBase):
+    pages = {
+        'about/index.de.md': "title: About\nname: Über uns\nindex: true\n"
+                             "rank: 2\n",
+        'about/team.de.md': "title: Team\nrank: 2\nglyphicon: glyphicon-user\n",
+        'about/news.de.md': "title: Neuigkeiten\nrank: 1\nlink: /news/\n",
+        'legal/index.de.md': "title: Legal\nname: Rechtliches\nindex: true\n"
+                             "rank: 1\n",
+        'legal/imprint.de.md': "title: Impressum\n",
+    }
+
+    def setUp(self):
+        super().setUp()
+        for path, content in self.pages.items():
+            directory = os.path.join(self.content_dir.name, dirname(path))
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(self.content_dir.name, path), 'w') as f:
+                f.write(content + "\nContent\n")
+        self.write_news(0)
+        cf_pages.reload()
+
+    def test_navigation_model(self):
+        with self.app.test_request_context():
+            navigation = cf_pages.get_navigation()
+
+        self.assertEqual([c.id for c in navigation], ['legal', 'about'])
+        legal, about = navigation
+        self.assertEqual(about.name, "Über uns")
+        self.assertEqual([a.id for a in about.articles], ['news', 'team'])
+        self.assertEqual(about.articles[0].link, '/news/')
+        self.assertEqual(about.articles[1].glyphicon, 'glyphicon-user')
+        self.assertIsNone(about.articles[1].link)
+
+    def test_navigation_rendered(self):
+        with self.app.test_request_context(base_url='http://localhost/sipa'):
+            html = cf_pages.render_navigation()
+
+        self.assertIn('href="/sipa/pages/about/team"', html)
+        self.assertIn('href="http://localhost/sipa/news/"', html)
+        self.assertLess(html.index("Rechtliches"), html.index("Über uns"))
+
+    def test_navigation_cached(self):
+        with patch('sipa.flatpages.render_template',
+                   wraps=render_template) as render:
+            for base_url in ['http://localhost', 'http://localhost',
+                             'http://localhost/sipa']:
+                with self.app.test_request_context(base_url=base_url):
+                    cf_pages.render_navigation()
+
+        self.assertEqual(render.call_count, 2)
+
+    def test_navigation_rebuilt_on_reload(self):
+        with self.app.test_request_context():
+            navigation = cf_pages.get_navigation()
+            os.remove(os.path.join(self.content_dir.name, 'legal/index.de.md'))
+            cf_pages.reload_if_changed()
+
+            self.assertIsNot(cf_pages.get_navigation(), navigation)
+            self.assertEqual([c.id for c in cf_pages.get_navigation()],
+                             ['about'])
+
+
+class DynamicJsonTestCase(FlatPagesTestBase):
+    def setUp(self):
+        super().setUp()
+        os.mkdir(os.path.join(self.content_dir.name, 'about'))
+        with open(os.path.join(self.content_dir.name,
+                               'about/fees.de.md'), 'w') as f:
+            f.write("title: Fees\n\nContent\n")
+        self.json_path = os.path.join(self.content_dir.name,
+                                      'about/fees.de.json')
+        self.write_json({
+            'title': "Fees",
+            'keys': {'fee': "Fee"},
+            'values': {'a': {'fee': "5 €"}},
+            'mappings': {dorm.name: 'a' for dorm in backends.dormitories},
+        })
+        cf_pages.reload()
+
+    def write_json(self, content):
+        with open(self.json_path, 'w') as f:
+            f.write(content if isinstance(content, str)
+                    else json.dumps(content))
+
+    def get_page(self):
+        return self.client.get(url_for('pages.show', category_id='about',
+                                       article_id='fees'))
+
+    def test_projection_passed(self):
+        self.assert200(self.get_page())
+        self.assertTrue(self.get_context_variable('dynamic'))
+        self.assertEqual(self.get_context_variable('values'),
+                         {dorm.name: {'fee': "5 €"} for dorm in backends.dormitories})
+        self.assertEqual(self.get_context_variable('dormitories'),
+                         [(dorm.name, dorm.display_name)
+                          for dorm in backends.dormitories])
+
+    def test_parsed_once(self):
+        with patch('sipa.blueprints.pages.load_dynamic_json',
+                   wraps=load_dynamic_json) as load:
+            for _ in range(3):
+                self.assert200(self.get_page())
+
+        self.assertEqual(load.call_count, 1)
+
+    def test_corrupt_file_reported_once(self):
+        self.write_json("{")
+        cf_pages.reload_if_changed()
+
+        with self.assertLogs('sipa.blueprints.pages', 'ERROR') as logs:
+            for _ in range(3):
+                self.assert200(self.get_page())
+                self.assertFalse(self.get_context_variable('dynamic'))
+        self.assertEqual(len(logs.output), 1)
+
+    def test_incomplete_file_ignored(self):
+        self.write_json({'title': "Fees"})
+        cf_pages.reload_if_changed()
+
+        self.assert200(self.get_page())
+        self.assertFalse(self.get_context_variable('dynamic'))
+
+    def test_reparsed_on_change(self):
+        self.assert200(self.get_page())
+        self.write_json({'title': "Other fees", 'keys': {}, 'values': {},
+                         'mappings': {}})
+        self.assertTrue(cf_pages.reload_if_changed())
+
+        self.assert200(self.get_page())
+        self.assertEqual(self.get_context_variable('title'), "Other fees")
+
+
+class ContentReloaderTestCase(FlatPagesTestBase):
+    def setUp(self):
+        super().setUp()
+        self.write_news(0)
+        cf_pages.reload()
+        self.reloader = self.app.extensions['content_reloader']
+
+    def test_version_file_in_temp_dir_by_default(self):
+        path = default_version_file(self.content_dir.name)
+        self.assertEqual(os.path.dirname(path), gettempdir())
+        self.assertNotEqual(path, default_version_file('/other'))
+
+    def test_reloaded_in_current_process(self):
+        self.write_news(1)
+        self.reloader.reload()
+        self.assertEqual(len(self.news), 2)
+
+        with open(self.reloader.version_file) as f:
+            self.assertEqual(f.read(), cf_pages.content_version)
+
+    def test_outdated_process_reloaded_before_request(self):
+        self.write_news(1)
+        with open(self.reloader.version_file, 'w') as f:
+            f.write("some other version")
+
+        with self.app.test_request_context('/'):
+            self.app.preprocess_request()
+        self.assertEqual(len(self.news), 2)
+
+        # the version file is only read again once it has changed
+        with patch.object(self.reloader, 'reload_local') as reload_local:
+            self.assertFalse(self.reloader.reload_if_outdated())
+        reload_local.assert_not_called()
+
+    def test_other_worker_reloaded(self):
+        parent_conn, child_conn = Pipe()
+
+        def worker():
+            try:
+                child_conn.send(len(self.news))
+                child_conn.recv()
+                with self.app.test_request_context('/'):
+                    self.app.preprocess_request()
+                child_conn.send(len(self.news))
+            finally:
+                os._exit(0)
+
+        process = get_context('fork').Process(target=worker)
+        process.start()
+        try:
+            self.assertEqual(parent_conn.recv(), 1)
+            self.write_news(1)
+            self.reloader.reload()
+            parent_conn.send('reloaded')
+            self.assertTrue(parent_conn.poll(10))
+            self.assertEqual(parent_conn.recv(), 2)
+        finally:
+            process.join(10)
+
+    def test_scans_rate_limited(self):
+        self.reloader.scan_interval = 5
+        self.reloader._last_scan = None
+
+        with patch('sipa.content.monotonic', return_value=100):
+            self.assertFalse(self.reloader.reload_if_changed())
+        self.write_news(1)
+        with patch('sipa.content.monotonic', return_value=104):
+            self.assertFalse(self.reloader.reload_if_changed())
+        self.assertEqual(len(self.news), 1)
+
+        with patch('sipa.content.monotonic', return_value=105):
+            self.assertTrue(self.reloader.reload_if_changed())
+        self.assertEqual(len(self.news), 2)
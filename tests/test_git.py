@@ -1,14 +1,16 @@
 # -*- coding: utf-8; -*-
 
 import os
+from datetime import datetime
 from shutil import rmtree
 from subprocess import call
 from tempfile import mkdtemp, TemporaryDirectory
 from unittest import TestCase
+from unittest.mock import patch
 
-from git import Repo
+from git import Git, Repo
 
-from sipa.utils.git_utils import init_repo, update_repo
+from sipa.utils.git_utils import get_version_info, init_repo, update_repo
 
 SAMPLE_FILE_NAME = "sample_file"
 OTHER_FILE_NAME = "other_sample_file"
@@ -189,7 +191,7 @@ class TestUpdateRepo(ExplicitlyClonedSampleRepoTestBase):
             tmp_clone.remote('origin').push()
 
     def update_repo(self):
-        update_repo(self.cloned_repo_path)
+        return update_repo(self.cloned_repo_path)
 
     def test_commitsha_different_before_update(self):
         self.assertNotEqual(self.repo.commit().hexsha, self.cloned_repo.commit().hexsha)
@@ -197,3 +199,41 @@ class TestUpdateRepo(ExplicitlyClonedSampleRepoTestBase):
     def test_same_commit_after_update(self):
         self.update_repo()
         self.assertEqual(self.repo.commit().hexsha, self.cloned_repo.commit().hexsha)
+
+    def test_changed_paths_returned(self):
+        self.assertEqual(self.update_repo(), [OTHER_FILE_NAME])
+        self.assertTrue(os.path.isfile(os.path.join(self.cloned_repo_path,
+                                                    OTHER_FILE_NAME)))
+
+    def test_nothing_changed_after_update(self):
+        self.update_repo()
+        self.assertEqual(self.update_repo(), [])
+
+    def test_fetched_once(self):
+        with patch.object(Git, 'execute', autospec=True,
+                          side_effect=Git.execute) as execute:
+            self.update_repo()
+
+        commands = [call_args[0][1] for call_args in execute.call_args_list]
+        self.assertEqual(sum('fetch' in command for command in commands), 1)
+
+    def test_unreachable_remote(self):
+        head = self.cloned_repo.commit().hexsha
+        rmtree(self.repo_path)
+        with self.assertLogs('sipa.utils.git_utils', 'ERROR'):
+            self.assertEqual(self.update_repo(), [])
+        self.assertEqual(self.cloned_repo.commit().hexsha, head)
+
+
+class TestVersionInfo(ExplicitlyClonedSampleRepoTestBase):
+    def test_version_info(self):
+        info = get_version_info(self.cloned_repo_path, 20)
+        self.assertEqual(info.active_branch, 'master')
+        self.assertEqual(len(info.commits), 1)
+        self.assertEqual(info.commits[0]['hexsha'],
+                         self.cloned_repo.commit().hexsha)
+        self.assertIsInstance(info.commits[0]['date'], datetime)
+
+    def test_missing_repo(self):
+        info = get_version_info(os.path.join(self.workdir, 'missing'), 20)
+        self.assertEqual(info, ("Unknown", []))
@@ -0,0 +1,190 @@
+import os
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+from xml.etree import ElementTree
+
+from babel import Locale
+
+from sipa.utils.cache import MemoryCache
+from sipa.utils.exceptions import InvalidConfiguration
+from sipa.utils.graph_utils import CHART_GENERATORS, chart_cache_key, \
+    generate_credit_chart, generate_traffic_chart, native_credit_chart, \
+    native_traffic_chart, provide_render_function, traffic_style
+from sipa.utils.svg_charts import SvgChart, guide_values
+from tests.base import SampleFrontendTestBase
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(__file__), 'snapshots')
+SVG = '{http://www.w3.org/2000/svg}'
+
+
+def sample_history(offset=0):
+    return [{
+        'day': day,
+        'input': 1024 * (day + offset),
+        'output': 512 * day,
+        'throughput': 1024 * (day + offset) + 512 * day,
+        'credit': 1024**2 * (day + 10),
+    } for day in range(7)]
+
+
+class ChartRenderingTestCase(SampleFrontendTestBase):
+    def test_charts_render_svg(self):
+        for generator in [generate_traffic_chart, generate_credit_chart,
+                          native_traffic_chart, native_credit_chart]:
+            with self.subTest(generator=generator), \
+                    self.app.test_request_context():
+                rendered = provide_render_function(generator)(sample_history())
+                self.assertIn("<svg", rendered)
+
+
+class NativeChartTestCase(SampleFrontendTestBase):
+    def render(self, generator, **kwargs):
+        with self.app.test_request_context(), \
+                patch('sipa.utils.babel_utils.get_locale',
+                      return_value=Locale('en')):
+            return generator(sample_history(), **kwargs).render()
+
+    def parse(self, generator, **kwargs):
+        return ElementTree.fromstring(self.render(generator, **kwargs))
+
+    def test_snapshots(self):
+        """Compare the rendered charts to the reviewed snapshots
+
+        After an intended change of the look, run the tests with
+        ``SIPA_UPDATE_SNAPSHOTS=1`` to write the snapshots anew, and
+        review and commit them.
+        """
+        update = bool(os.environ.get('SIPA_UPDATE_SNAPSHOTS'))
+        for name, generator in CHART_GENERATORS['native'].items():
+            with self.subTest(chart=name):
+                rendered = self.render(generator)
+                path = os.path.join(SNAPSHOT_DIR, '{}_chart.svg'.format(name))
+                if update:
+                    with open(path, 'w') as f:
+                        f.write(rendered)
+
+                self.assertTrue(os.path.exists(path),
+                                msg="Snapshot {} is missing".format(path))
+                with open(path) as f:
+                    self.assertEqual(rendered, f.read())
+
+    def test_traffic_chart_bars(self):
+        svg = self.parse(native_traffic_chart)
+        series = svg.findall('.//{0}g[@class="plot"]/{0}g'.format(SVG))
+
+        self.assertEqual(len(series), 3)
+        for group, color in zip(series, traffic_style.colors):
+            self.assertEqual(group.get('fill'), color)
+            self.assertEqual(len(group.findall(SVG + 'rect')), 7)
+        self.assertEqual([g.get('stroke-dasharray') for g in series],
+                         ['5', '5', None])
+
+    def test_credit_chart_lines(self):
+        svg = self.parse(native_credit_chart, max_credit=63 * 1024**2)
+        credit, maximum = svg.findall(
+            './/{0}g[@class="plot"]/{0}g'.format(SVG)
+        )
+
+        self.assertEqual(len(credit.findall(SVG + 'circle')), 7)
+        self.assertIsNotNone(credit.find(SVG + 'polygon'))
+        self.assertEqual(len(maximum.findall(SVG + 'circle')), 0)
+        self.assertIsNone(maximum.find(SVG + 'polygon'))
+        self.assertEqual(maximum.get('stroke-dasharray'), '7')
+
+    def test_weekday_labels(self):
+        svg = self.parse(native_traffic_chart)
+        labels = [text.text for text in svg.findall(
+            './/{0}g[@class="axis x"]/{0}text'.format(SVG)
+        )]
+        self.assertEqual(labels, ["Monday", "Tuesday", "Wednesday",
+                                  "Thursday", "Friday", "Saturday", "Sunday"])
+
+
+class GuideValuesTestCase(TestCase):
+    def test_guide_values(self):
+        for maximum, expected in [(63, [0, 20, 40, 60, 80]),
+                                  (4.5, [0, 1, 2, 3, 4, 5]),
+                                  (0.3, [0, 0.1, 0.2, 0.3]),
+                                  (1000, [0, 200, 400, 600, 800, 1000]),
+                                  (0, [0, 1])]:
+            with self.subTest(maximum=maximum):
+                values = guide_values(maximum)
+                self.assertEqual(len(values), len(expected))
+                for value, expected_value in zip(values, expected):
+                    self.assertAlmostEqual(value, expected_value)
+
+
+class SvgChartTestCase(TestCase):
+    def test_layout_required(self):
+        class IncompleteChart(SvgChart):
+            kind = 'incomplete'
+
+        with self.assertRaises(TypeError):
+            IncompleteChart("Title", style=MagicMock())
+
+
+class ChartRendererConfigTestCase(SampleFrontendTestBase):
+    def test_native_renderer_default(self):
+        self.assertEqual(self.app.extensions['chart_generators'],
+                         CHART_GENERATORS['native'])
+
+    def test_pygal_renderer(self):
+        app = self.create_app(additional_config={'CHART_RENDERER': 'pygal'})
+        self.assertEqual(app.extensions['chart_generators'],
+                         CHART_GENERATORS['pygal'])
+
+    def test_unknown_renderer(self):
+        with self.assertRaises(InvalidConfiguration):
+            self.create_app(additional_config={'CHART_RENDERER': 'foo'})
+
+
+class ChartCacheTestCase(SampleFrontendTestBase):
+    def setUp(self):
+        super().setUp()
+        self.cache = MemoryCache(max_size=4, ttl=None)
+        self.generator = MagicMock(wraps=generate_credit_chart,
+                                   __name__='generate_credit_chart')
+        self.render = provide_render_function(self.generator,
+                                              cache=self.cache)
+
+    def test_rendered_once(self):
+        with self.app.test_request_context():
+            first = self.render(sample_history(), max_credit=63 * 1024**2)
+            second = self.render(sample_history(), max_credit=63 * 1024**2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(self.generator.call_count, 1)
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_changed_input_rendered_again(self):
+        with self.app.test_request_context():
+            with patch('sipa.utils.graph_utils.get_locale',
+                       return_value='de'):
+                self.render(sample_history())
+                self.render(sample_history(offset=1))
+                self.render(sample_history(), max_credit=10 * 1024**2)
+            with patch('sipa.utils.graph_utils.get_locale',
+                       return_value='en'):
+                self.render(sample_history())
+
+        self.assertEqual(self.generator.call_count, 4)
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_cache_bounded(self):
+        with self.app.test_request_context():
+            for offset in range(10):
+                self.render(sample_history(offset))
+
+        self.assertEqual(len(self.cache), 4)
+
+    def test_key_distinguishes_generators(self):
+        with self.app.test_request_context():
+            keys = {chart_cache_key(generator, sample_history())
+                    for generator in [generate_traffic_chart,
+                                      generate_credit_chart]}
+        self.assertEqual(len(keys), 2)
+
+    def test_app_uses_chart_cache(self):
+        self.assertIn('chart_cache', self.app.extensions)
@@ -1,9 +1,17 @@
 from itertools import permutations
+from threading import Event, Thread
 from time import time
 from unittest import TestCase
+from unittest.mock import patch
+
+from markdown import Markdown
+from werkzeug.contrib.cache import SimpleCache
 
 from sipa.utils import dict_diff, replace_empty_handler_callables, \
     timetag_today
+from sipa.utils.cache import ClientCache, MemoryCache
+from sipa.utils.link_patch import rewrite_links
+from sipa.utils.metrics import LatencyHistogram
 
 
 class TimetagValidator(TestCase):
@@ -82,3 +90,173 @@ class TestHandlerReplacer(TestCase):
             ['()'],
         )
         self.assertEqual(result['()'], self.do_nothing)
+
+
+class MemoryCacheTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = MemoryCache(max_size=2, ttl=60)
+
+    def test_get_set_delete(self):
+        self.assertIsNone(self.cache.get('foo'))
+        self.assertEqual(self.cache.get('foo', 'default'), 'default')
+
+        self.cache.set('foo', 42)
+        self.assertEqual(self.cache.get('foo'), 42)
+
+        self.cache.delete('foo')
+        self.assertIsNone(self.cache.get('foo'))
+
+    def test_entries_expire(self):
+        with patch('sipa.utils.cache.monotonic', return_value=0):
+            self.cache.set('foo', 42)
+
+        with patch('sipa.utils.cache.monotonic', return_value=59):
+            self.assertEqual(self.cache.get('foo'), 42)
+
+        with patch('sipa.utils.cache.monotonic', return_value=60):
+            self.assertIsNone(self.cache.get('foo'))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_least_recently_used_evicted(self):
+        self.cache.set('foo', 1)
+        self.cache.set('bar', 2)
+        self.cache.get('foo')
+        self.cache.set('baz', 3)
+
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get('foo'), 1)
+        self.assertIsNone(self.cache.get('bar'))
+        self.assertEqual(self.cache.get('baz'), 3)
+
+    def test_entries_without_ttl_kept(self):
+        cache = MemoryCache(max_size=2, ttl=None)
+        with patch('sipa.utils.cache.monotonic', return_value=0):
+            cache.set('foo', 42)
+
+        with patch('sipa.utils.cache.monotonic', return_value=10**9):
+            self.assertEqual(cache.get('foo'), 42)
+
+    def test_hits_and_misses_counted(self):
+        self.cache.set('foo', 42)
+        self.cache.get('foo')
+        self.cache.get('bar')
+
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    def test_get_or_create_caches_result(self):
+        calls = []
+
+        def creator():
+            calls.append(None)
+            return None
+
+        for _ in range(3):
+            self.assertIsNone(self.cache.get_or_create('foo', creator))
+        self.assertEqual(len(calls), 1)
+
+        with patch('sipa.utils.cache.monotonic', return_value=10**9):
+            self.cache.get_or_create('foo', creator)
+        self.assertEqual(len(calls), 2)
+
+    def test_get_or_create_exceptions_not_cached(self):
+        def creator():
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            self.cache.get_or_create('foo', creator)
+        self.assertEqual(self.cache.get_or_create('foo', lambda: 42), 42)
+
+    def test_get_or_create_single_flight(self):
+        started = Event()
+        release = Event()
+        calls = []
+
+        def creator():
+            calls.append(None)
+            started.set()
+            release.wait(5)
+            return 42
+
+        results = []
+
+        def lookup():
+            results.append(self.cache.get_or_create('foo', creator))
+
+        threads = [Thread(target=lookup) for _ in range(4)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [42] * 4)
+
+
+class ClientCacheTestCase(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = SimpleCache()
+        self.cache = ClientCache(self.client, ttl=60, prefix='test:')
+
+    def test_keys_prefixed(self):
+        self.cache.set('foo', 42)
+        self.assertEqual(self.client.get('test:foo'), 42)
+        self.assertEqual(self.cache.get('foo'), 42)
+
+        self.cache.delete('foo')
+        self.assertIsNone(self.cache.get('foo'))
+
+    def test_ttl_passed_on(self):
+        with patch.object(self.client, 'set') as set_mock:
+            self.cache.set('foo', 42)
+        self.assertEqual(set_mock.call_args[1], {'timeout': 60})
+
+
+class RewriteLinksTestCase(TestCase):
+    def test_absolute_links_prefixed(self):
+        html = '<a href="/news/">News</a><img SRC="/static/a.png">'
+        for prefix in ['/sipa', '/sipa/']:
+            with self.subTest(prefix=prefix):
+                self.assertEqual(rewrite_links(html, prefix),
+                                 '<a href="/sipa/news/">News</a>'
+                                 '<img SRC="/sipa/static/a.png">')
+
+    def test_other_links_kept(self):
+        html = '<a href="news/">a</a><a href="https://agdsn.de/">b</a>'
+        self.assertEqual(rewrite_links(html, '/sipa'), html)
+
+    def test_empty_prefix(self):
+        html = '<a href="/news/">News</a>'
+        for prefix in ['', '/']:
+            with self.subTest(prefix=prefix):
+                self.assertEqual(rewrite_links(html, prefix), html)
+
+    def test_link_patch_extension_ignored(self):
+        with self.assertLogs('sipa.utils.link_patch', level='WARNING'):
+            md = Markdown(extensions=['sipa.utils.link_patch'])
+        self.assertNotIn('link_patch', md.postprocessors)
+
+
+class LatencyHistogramTestCase(TestCase):
+    def setUp(self):
+        self.histogram = LatencyHistogram(buckets=(1, 0.1))
+
+    def test_buckets_cumulative(self):
+        for seconds in [0.05, 0.1, 0.5, 3]:
+            self.histogram.observe(seconds)
+
+        metrics = self.histogram.metrics
+        self.assertEqual(metrics['count'], 4)
+        self.assertAlmostEqual(metrics['sum'], 3.65)
+        self.assertEqual(metrics['buckets'], {'0.1': 2, '1': 3, '+Inf': 4})
+
+    def test_failed_block_timed(self):
+        with self.assertRaises(ValueError), self.histogram.time():
+            raise ValueError
+
+        self.assertEqual(self.histogram.count, 1)